@@ -0,0 +1,90 @@
+import argparse
+import json
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+# Checks that the deep-dive scanner's incremental indicators (indicator_state, read by
+# analytics.get_latest) match the pinned pandas_ta that the hit charts use
+# (feature_store specs, read by analytics.get_data), on a synthetic universe.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import generate_universe  # noqa: E402
+from services import feature_store, indicator_state  # noqa: E402
+from analytics import DEEP_DIVE_FEATURES  # noqa: E402
+
+DEFAULT_TOLERANCE = 1e-8  # Relative (absolute below 1.0); pandas rolling sums differ only by rounding
+NEW_BARS = 5  # Bars fed after a JSON round trip of the state, like a daily scan resuming
+
+
+def incremental_rows(history, new_bars=NEW_BARS):
+    """Indicator rows for the last `new_bars` bars, built the way get_latest does it: persisted state + new bars."""
+    state = indicator_state.IndicatorState()
+    state.update_frame(history.iloc[:-new_bars])
+    resumed = indicator_state.IndicatorState()
+    resumed.restore(json.loads(json.dumps(state.state())))
+    rows = [resumed.update(date, float(bar.High), float(bar.Low), float(bar.Close), bar.Volume)
+            for date, bar in history.iloc[-new_bars:].iterrows()]
+    return pd.DataFrame(rows, index=history.index[-new_bars:])
+
+
+def reference_rows(history, new_bars=NEW_BARS):
+    """The same rows from the pandas_ta feature specs over the full history (what get_data computes)."""
+    frames = [feature_store.SPECS[feature].compute(history) for feature in DEEP_DIVE_FEATURES]
+    return pd.concat(frames, axis=1).iloc[-new_bars:]
+
+
+def compare(histories, tolerance=DEFAULT_TOLERANCE):
+    """Returns {column: worst relative error} and a list of (ticker, column, problem) failures."""
+    worst, failures = {}, []
+    for ticker, history in histories.items():
+        history = history.copy()
+        history.index = history.index.tz_localize(None)
+        ours, ref = incremental_rows(history), reference_rows(history)
+        for column in sorted(set(ours.columns) ^ set(ref.columns)):
+            failures.append((ticker, column, "missing from indicator_state" if column in ref else "not in pandas_ta"))
+        for column in ours.columns.intersection(ref.columns):
+            a, b = ours[column].to_numpy(float), ref[column].to_numpy(float)
+            if (np.isnan(a) != np.isnan(b)).any():
+                failures.append((ticker, column, "NaN mismatch"))
+                continue
+            valid = ~np.isnan(b)
+            error = float(np.max(np.abs(a[valid] - b[valid]) / np.maximum(np.abs(b[valid]), 1.0), initial=0.0))
+            worst[column] = max(worst.get(column, 0.0), error)
+            if error > tolerance:
+                failures.append((ticker, column, f"error {error:.2e}"))
+    return worst, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="indicator_state vs pandas_ta parity on a synthetic universe.")
+    parser.add_argument("--tickers", type=int, default=200)
+    parser.add_argument("--years", type=float, default=2)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+
+    try:
+        import pandas_ta
+    except ImportError:
+        print("⏭️ pandas_ta is not installed; skipping the indicator parity check.")
+        return
+    print(f"🧪 indicator_state vs pandas_ta {getattr(pandas_ta, 'version', '?')}: "
+          f"{args.tickers} tickers × {args.years}y (seed {args.seed}), last {NEW_BARS} bars")
+
+    worst, failures = compare(generate_universe(args.tickers, args.years, args.seed), args.tolerance)
+    for column, error in sorted(worst.items()):
+        print(f"   {column:<22} max error {error:.2e}")
+    if failures:
+        for ticker, column, problem in failures[:20]:
+            print(f"   ❌ {ticker} {column}: {problem}")
+        print(f"\n❌ {len(failures)} mismatch(es) beyond {args.tolerance:g}")
+        sys.exit(1)
+    print("\n✅ Indicators match pandas_ta.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Callable, NamedTuple
+import numpy as np
+
+# Benchmarks call into src/ like the standalone scripts, so make it importable
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import generate_universe  # noqa: E402
+from config.settings import LOOKBACK_DAYS  # noqa: E402
+from services import market_data, technical_analysis, ai_engine, charting, indicator_state  # noqa: E402
+from services.lstm_inference import NumpyLSTMModel  # noqa: E402
+import backtest  # noqa: E402
+import analytics  # noqa: E402
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+SCREENER_BARS = 126  # ~6mo, the screener's fetch period
+DEFAULT_THRESHOLD = 0.15  # Flag a benchmark when its median call is >15% slower than the baseline
+
+
+def random_model(seed=0):
+    """NumPy model with the production LSTM's layer shapes and random weights (no training, no TensorFlow)."""
+    rng = np.random.default_rng(seed)
+
+    def dense(n_in, n_out):
+        return rng.normal(0, np.sqrt(2.0 / (n_in + n_out)), (n_in, n_out)).astype(np.float32)
+
+    def lstm(n_in, units):
+        return [dense(n_in, 4 * units), dense(units, 4 * units), np.zeros(4 * units, dtype=np.float32)]
+
+    return NumpyLSTMModel([
+        ("lstm", "sequences", lstm(5, 50)),
+        ("lstm", "last", lstm(50, 50)),
+        ("dense", "relu", [dense(50, 25), np.zeros(25, dtype=np.float32)]),
+        # Output gain spreads scores across the 0.75 threshold so backtests actually open trades
+        ("dense", "sigmoid", [dense(25, 1) * 100, np.zeros(1, dtype=np.float32)]),
+    ])
+
+
+class Universe:
+    """Synthetic histories plus the derived frames each benchmark starts from (built lazily, untimed)."""
+
+    def __init__(self, tickers, years, seed):
+        self.tickers, self.years, self.seed = tickers, years, seed
+        started = time.perf_counter()
+        self.histories = generate_universe(tickers, years, seed)
+        self.generate_seconds = time.perf_counter() - started
+        self.model = random_model(seed)
+        self._cache = {}
+
+    def _cached(self, key, build):
+        if key not in self._cache:
+            self._cache[key] = build()
+        return self._cache[key]
+
+    def screener_histories(self):
+        return self._cached('screener_histories', lambda: {
+            t: h.tail(SCREENER_BARS) for t, h in self.histories.items()})
+
+    def screener_frames(self):
+        return self._cached('screener_frames', lambda: {
+            t: df for t, df in ((t, market_data.prepare_market_data(h))
+                                for t, h in self.screener_histories().items()) if df is not None})
+
+    def backtest_frames(self):
+        return self._cached('backtest_frames', lambda: {
+            t: df for t, df in ((t, market_data.prepare_market_data(h))
+                                for t, h in self.histories.items()) if df is not None})
+
+    def deep_dive_frames(self):
+        """What analytics.get_latest hands to strategy_deep_dive: the tail plus indicators for the last two rows."""
+        def build():
+            frames = {}
+            for ticker, history in self.histories.items():
+                df = history.copy()
+                df.index = df.index.tz_localize(None)
+                state = indicator_state.IndicatorState()
+                state.update_frame(df)
+                frames[ticker] = df.tail(analytics.FIB_LOOKBACK).join(state.frame())
+            return frames
+        return self._cached('deep_dive_frames', build)
+
+
+class Benchmark(NamedTuple):
+    name: str
+    target: str  # Function under test
+    inputs: Callable  # Universe -> {ticker: argument}
+    call: Callable  # (ticker, argument, universe) -> result
+    summarize: Callable  # [results] -> small dict recorded with the timings (sanity check)
+    limit: int = None  # Default cap on tickers per repeat (None = whole universe)
+
+
+def _count(results, predicate):
+    return sum(1 for r in results if predicate(r))
+
+
+BENCHMARKS = [
+    Benchmark(
+        'prepare_market_data', 'market_data.prepare_market_data (get_market_data post-processing)',
+        Universe.screener_histories,
+        lambda t, history, u: market_data.prepare_market_data(history),
+        lambda rs: {'frames': _count(rs, lambda r: r is not None)}),
+    Benchmark(
+        'check_filters', 'technical_analysis.check_filters',
+        Universe.screener_frames,
+        lambda t, df, u: technical_analysis.check_filters(df),
+        lambda rs: {'passed': _count(rs, lambda r: r[0])}),
+    Benchmark(
+        'calculate_trade_setup', 'technical_analysis.calculate_trade_setup',
+        Universe.screener_frames,
+        lambda t, df, u: technical_analysis.calculate_trade_setup(df),
+        lambda rs: {'tradeable': _count(rs, lambda r: r['lots'] >= 3)}),
+    Benchmark(
+        'get_lstm_score', 'ai_engine.get_lstm_score',
+        Universe.screener_frames,
+        lambda t, df, u: ai_engine.get_lstm_score(u.model, df),
+        lambda rs: {'mean_score': round(float(np.mean(rs)), 6) if rs else 0.0}),
+    Benchmark(
+        'render_chart', 'charting.render_chart (in-memory PNG)',
+        Universe.screener_frames,
+        lambda t, df, u: len(charting.render_chart(
+            df, t, {'dist_from_low': 0.1, 'volatility': 0.02, 'obv_slope': 0.1},
+            technical_analysis.calculate_trade_setup(df))),
+        lambda rs: {'mean_png_bytes': int(np.mean(rs)) if rs else 0},
+        limit=10),
+    Benchmark(
+        'run_simulation', 'backtest.run_simulation',
+        Universe.backtest_frames,
+        lambda t, df, u: backtest.run_simulation(t, u.model, df),
+        lambda rs: {'simulated': _count(rs, lambda r: r is not None),
+                    'trades': int(sum(r['trades'] for r in rs if r is not None))},
+        limit=200),
+    Benchmark(
+        'strategy_deep_dive', 'analytics.strategy_deep_dive',
+        Universe.deep_dive_frames,
+        lambda t, df, u: analytics.strategy_deep_dive(df, t),
+        lambda rs: {'signals': _count(rs, lambda r: 'WAIT' not in r['signal'])},
+        limit=200),
+]
+
+
+def time_benchmark(bench, universe, repeats, limit=None):
+    """Calls the target once per ticker, `repeats` times over; returns per-call latency stats in ms."""
+    inputs = list(bench.inputs(universe).items())
+    limit = limit if limit is not None else bench.limit
+    if limit is not None:
+        inputs = inputs[:limit]
+
+    samples, results = [], []
+    for _ in range(repeats):
+        results = []
+        for ticker, argument in inputs:
+            started = time.perf_counter()
+            results.append(bench.call(ticker, argument, universe))
+            samples.append(time.perf_counter() - started)
+
+    ms = np.array(samples) * 1000
+    total = float(ms.sum()) / 1000
+    return {
+        'target': bench.target,
+        'calls': len(inputs),
+        'repeats': repeats,
+        'median_ms': float(np.median(ms)) if len(ms) else 0.0,
+        'mean_ms': float(ms.mean()) if len(ms) else 0.0,
+        'p95_ms': float(np.percentile(ms, 95)) if len(ms) else 0.0,
+        'min_ms': float(ms.min()) if len(ms) else 0.0,
+        'total_s': total,
+        'calls_per_s': len(ms) / total if total else 0.0,
+        'output': bench.summarize(results),
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def run(tickers, years, seed, repeats, only=None, limit=None):
+    """Runs the selected benchmarks on a fresh synthetic universe and returns the report dict."""
+    print(f"🧪 Generating synthetic universe: {tickers} tickers × {years}y (seed {seed})...")
+    universe = Universe(tickers, years, seed)
+    print(f"   Done in {universe.generate_seconds:.1f}s")
+
+    report = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'universe': {'tickers': tickers, 'years': years, 'seed': seed, 'lookback_days': LOOKBACK_DAYS},
+        'environment': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': market_data.pd.__version__,
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+        },
+        'benchmarks': {},
+    }
+
+    for bench in BENCHMARKS:
+        if only and bench.name not in only:
+            continue
+        print(f"⏱️  {bench.name}...", end=" ", flush=True)
+        stats = time_benchmark(bench, universe, repeats, limit)
+        report['benchmarks'][bench.name] = stats
+        print(f"median {stats['median_ms']:.3f} ms | p95 {stats['p95_ms']:.3f} ms | "
+              f"{stats['calls_per_s']:,.0f}/s | {stats['output']}")
+    return report
+
+
+def compare(report, baseline, threshold=DEFAULT_THRESHOLD):
+    """Prints median-latency ratios against a baseline report; returns the names that regressed beyond threshold."""
+    if report['universe'] != baseline['universe']:
+        print(f"⚠️ Universe differs from baseline ({baseline['universe']}); ratios may not be comparable.")
+
+    regressions = []
+    print(f"\n📊 Against baseline {baseline.get('commit') or '?'} ({baseline.get('created_at', '?')}):")
+    for name, stats in report['benchmarks'].items():
+        base = baseline['benchmarks'].get(name)
+        if not base or not base['median_ms']:
+            print(f"   {name:<24} (no baseline)")
+            continue
+        ratio = stats['median_ms'] / base['median_ms']
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "❌ REGRESSION"
+            regressions.append(name)
+        elif ratio < 1 - threshold:
+            flag = "✅ faster"
+        print(f"   {name:<24} {base['median_ms']:>10.3f} → {stats['median_ms']:>10.3f} ms  ({ratio:.2f}x) {flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks on a synthetic IDX universe.")
+    parser.add_argument("--tickers", type=int, default=1000)
+    parser.add_argument("--years", type=float, default=2)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--limit", type=int, default=None,
+                        help="Tickers per benchmark (overrides the per-benchmark caps)")
+    parser.add_argument("--only", nargs="+", choices=[b.name for b in BENCHMARKS])
+    parser.add_argument("--output", help="Report path (default benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--baseline", help="Earlier report to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed slowdown of the median call before flagging (0.15 = 15%%)")
+    args = parser.parse_args()
+
+    report = run(args.tickers, args.years, args.seed, args.repeats, args.only, args.limit)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Report saved to {output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) beyond {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+        print("\n✅ No regressions.")
+
+
+if __name__ == "__main__":
+    main()
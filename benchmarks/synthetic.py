@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+
+# Deterministic synthetic IDX universe for offline benchmarks.
+# Every ticker is generated from its own (seed, index) stream, so the same
+# ticker always gets the same bars regardless of universe size or order.
+
+MARKET_TZ = "Asia/Jakarta"
+END_DATE = "2026-02-06"  # Fixed so results don't drift with the calendar
+TRADING_DAYS_PER_YEAR = 245
+
+# IDX tick size bands: (price below, tick)
+TICK_BANDS = [(200, 1), (500, 2), (2000, 5), (5000, 10), (np.inf, 25)]
+
+# Regimes the price walk cycles through: (daily drift, volatility multiplier, volume multiplier)
+REGIMES = {
+    'accumulation': (0.0005, 0.5, 1.3),
+    'markup': (0.004, 1.0, 1.1),
+    'distribution': (-0.0005, 0.7, 1.2),
+    'markdown': (-0.004, 1.2, 0.9),
+}
+
+
+def trading_calendar(days, end=END_DATE):
+    """The last `days` weekday sessions up to `end`, tz-aware like yfinance daily bars."""
+    return pd.bdate_range(end=end, periods=days, tz=MARKET_TZ, name='Date')
+
+
+def round_to_tick(prices):
+    """Rounds prices to the IDX tick size of their price band."""
+    ticks = np.select([prices < upper for upper, _ in TICK_BANDS], [tick for _, tick in TICK_BANDS])
+    return np.maximum(np.round(prices / ticks) * ticks, 1.0)
+
+
+def generate_history(index, seed, days):
+    """One ticker's OHLCV frame: regime-switching random walk, fat-tailed returns and volume spikes."""
+    rng = np.random.default_rng([seed, index])
+
+    start_price = float(np.exp(rng.uniform(np.log(80), np.log(15000))))
+    daily_vol = rng.uniform(0.01, 0.035)
+    base_volume = float(np.exp(rng.uniform(np.log(2e5), np.log(8e7))))
+
+    # Regime path: random phases of 20-80 sessions
+    names = list(REGIMES)
+    drift = np.empty(days)
+    vol_mult = np.empty(days)
+    volume_mult = np.empty(days)
+    i = 0
+    while i < days:
+        length = int(rng.integers(20, 81))
+        drift[i:i + length], vol_mult[i:i + length], volume_mult[i:i + length] = REGIMES[names[rng.integers(len(names))]]
+        i += length
+
+    returns = drift + daily_vol * vol_mult * rng.standard_t(4, days) / np.sqrt(2)
+    close = start_price * np.exp(np.cumsum(returns))
+
+    gap = daily_vol * 0.3 * rng.standard_normal(days)
+    open_ = np.concatenate(([start_price], close[:-1])) * np.exp(gap)
+    body_high = np.maximum(open_, close)
+    body_low = np.minimum(open_, close)
+    high = body_high * (1 + np.abs(rng.normal(0, daily_vol * 0.5, days)))
+    low = body_low * (1 - np.abs(rng.normal(0, daily_vol * 0.5, days)))
+
+    # Volume: lognormal noise scaled by regime, plus occasional institutional spikes
+    volume = base_volume * volume_mult * np.exp(rng.normal(0, 0.4, days))
+    volume *= np.where(rng.random(days) < 0.03, rng.uniform(2, 5, days), 1.0)
+    volume = np.round(volume / 100) * 100  # Whole lots
+
+    close, open_ = round_to_tick(close), round_to_tick(open_)
+    high = np.maximum(round_to_tick(high), np.maximum(open_, close))
+    low = np.minimum(round_to_tick(low), np.minimum(open_, close))
+
+    return pd.DataFrame({
+        'Open': open_, 'High': high, 'Low': low, 'Close': close,
+        'Volume': volume.astype('int64'),
+    }, index=trading_calendar(days))
+
+
+def generate_universe(tickers=1000, years=2, seed=42):
+    """Returns {ticker: OHLCV frame} for `tickers` synthetic .JK stocks with `years` of daily bars."""
+    days = int(years * TRADING_DAYS_PER_YEAR)
+    return {f"S{i:04d}.JK": generate_history(i, seed, days) for i in range(tickers)}
@@ -1,33 +1,116 @@
-import subprocess
+import os
 import sys
 import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
 
+# Stages run in-process, so make src/ importable like the standalone scripts expect
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
 
-def run_step(script_name, step_name):
-    print(f"\n{'='*40}\n🚀 STEP {step_name}: {script_name}\n{'='*40}")
+from config.settings import STOCK_LIST_FILE  # noqa: E402
+from services import market_data  # noqa: E402
+import daily_analytics  # noqa: E402
+import backtest  # noqa: E402
+import analytics  # noqa: E402
+import main as screener  # noqa: E402
+
+MARKET_PROXY = "BBCA.JK"
+
+
+class PipelineContext:
+    """State shared by every stage: one universe load, one price panel, one model."""
+
+    def __init__(self, force_retrain=False):
+        self.stock_list = market_data.load_stock_list(STOCK_LIST_FILE)
+        self.tickers = market_data.load_tickers(
+            STOCK_LIST_FILE, self.stock_list)
+        if MARKET_PROXY not in self.tickers:
+            self.tickers.append(MARKET_PROXY)
+
+        # Longest period any stage needs; stages trim it down themselves
+        print(f"📥 Loading 2y price panel for {len(self.tickers)} stocks...")
+        self.histories = market_data.get_history_bulk(
+            self.tickers, period="2y")
+        self.model = screener.load_or_train_model(force_retrain)
+        self.backtest_results = None
+
+
+def stage_market_brief(ctx):
+    tickers = daily_analytics.load_tickers(STOCK_LIST_FILE, ctx.stock_list)
+    if not tickers:
+        raise RuntimeError("Ticker load failed.")
+    stats = daily_analytics.analyze_market_health(
+        tickers, ctx.histories, ctx.model)
+    daily_analytics.send_daily_brief(stats)
+
+
+def stage_backtest(ctx):
+    frames = {}
+    for ticker, history in ctx.histories.items():
+        df = market_data.prepare_market_data(history, ticker)
+        if df is not None:
+            frames[ticker] = df
+    results = backtest.run_backtest(frames, model=ctx.model)
+    backtest.print_report(results)
+    ctx.backtest_results = backtest.results_frame(results)
+
+
+def stage_deep_dive(ctx):
+    analytics.run_bot(ctx.stock_list, ctx.histories, ctx.backtest_results)
+
+
+def stage_screener(ctx):
+    screener.run_screener(model=ctx.model, stock_list=ctx.stock_list,
+                          histories=ctx.histories)
+
+
+def run_step(step_fn, step_name, timings, *args):
+    """Runs one stage, recording its wall time; returns (ok, result)."""
+    print(f"\n{'='*40}\n🚀 STEP {step_name}\n{'='*40}")
+    start = time.perf_counter()
     try:
-        subprocess.run([sys.executable, script_name], check=True)
-        return True
-    except:
-        print(f"❌ {script_name} Failed.")
-        return False
+        result = step_fn(*args)
+        ok = True
+    except Exception as e:
+        logging.exception(f"❌ {step_name} Failed: {e}")
+        result, ok = None, False
+    timings.append((step_name, time.perf_counter() - start, ok))
+    return ok, result
 
 
-if __name__ == "__main__":
-    # 1. First, get the "Big Picture" of the market
-    run_step("src/daily_analytics.py", "1 (MARKET BRIEF)")
+def print_summary(timings, total):
+    print(f"\n{'='*40}\n⏱️ PIPELINE SUMMARY\n{'='*40}")
+    for name, elapsed, ok in timings:
+        status = "✅" if ok else "❌"
+        print(f"{status} {name:<28} {elapsed:>8.1f}s")
+    print("-" * 40)
+    print(f"   {'TOTAL (wall)':<28} {total:>8.1f}s")
 
-    time.sleep(2)
 
-    # 2. Then, run the Backtest Filter
-    if run_step("src/backtest.py", "2 (AGGRESSIVE BACKTEST)"):
-        time.sleep(2)
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO,
+                        format='%(asctime)s - %(levelname)s - %(message)s')
+    pipeline_start = time.perf_counter()
+    timings = []
+
+    # 0. Shared context (universe, price panel, model) for every stage
+    ok, ctx = run_step(PipelineContext, "0 (SHARED CONTEXT)",
+                       timings, "--retrain" in sys.argv)
 
-        # 3. Finally, scan for specific Buy Signals
-        run_step("src/analytics.py", "3 (DEEP DIVE SCANNER)")
+    if ok:
+        # 1 + 2. Market brief and backtest are independent: run them side by side
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            brief = pool.submit(run_step, stage_market_brief,
+                                "1 (MARKET BRIEF)", timings, ctx)
+            bt = pool.submit(run_step, stage_backtest,
+                             "2 (AGGRESSIVE BACKTEST)", timings, ctx)
+            brief.result()
+            backtest_ok, _ = bt.result()
 
-        time.sleep(2)
+        if backtest_ok:
+            # 3. Deep dive uses the backtest stats; 4. Wyckoff Accumulation Screener
+            run_step(stage_deep_dive, "3 (DEEP DIVE SCANNER)", timings, ctx)
+            run_step(stage_screener, "4 (WYCKOFF ACCUMULATION)", timings, ctx)
 
-        # 4. Wyckoff Accumulation Screener
-        run_step("src/wyckoff_screener.py", "4 (WYCKOFF ACCUMULATION)")
+    print_summary(timings, time.perf_counter() - pipeline_start)
     print("\n🚀 Pipeline Completed.")
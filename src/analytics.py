@@ -1,41 +1,44 @@
 import os
-import requests
-import json
-import yfinance as yf
 import pandas as pd
-import pandas_ta as ta
-import mplfinance as mpf
 import math
-import time
 from datetime import datetime
-import consts
+from config import settings
+from services import market_data, indicator_state, feature_store
+from services.chart_pool import chart_bytes, get_chart_pool
+from services.dispatcher import get_dispatcher
+from services.metrics import RunMetrics
 
 # --- CONFIGURATION ---
-DISCORD_WEBHOOK_URL = consts.DISCORD_WEBHOOK_Result
+DISCORD_WEBHOOK_URL = settings.DISCORD_WEBHOOK_URL
 
-STOCK_LIST_FILE = consts.STOCK_LIST_FILE
-BACKTEST_FILE = consts.BACKTEST_FILE
+STOCK_LIST_FILE = settings.STOCK_LIST_FILE
+BACKTEST_FILE = settings.BACKTEST_FILE
 
 # SETTINGS
-MIN_WIN_RATE = consts.MIN_WIN_RATE
+MIN_WIN_RATE = settings.MIN_WIN_RATE
 MIN_TRADES = 8
-CAPITAL_IDR = consts.CAPITAL_IDR
-RISK_PCT = consts.RISK_PCT
+CAPITAL_IDR = settings.CAPITAL_IDR
+RISK_PCT = settings.RISK_PCT
+
+FIB_LOOKBACK = 120
+DEEP_DIVE_FEATURES = ['STOCHRSI_14_14_3_3', 'ADX_14', 'SMA_200', 'EMA_50', 'RSI_14',
+                      'MACD_12_26_9', 'BBANDS_20_2', 'VOL_SMA_20']
+# All render_deep_dive_chart reads besides OHLC
+CHART_FEATURES = ['STOCHRSI_14_14_3_3', 'SMA_200']
 
 stock_stats = {}
 
 
-def load_tickers_with_filter(filename, backtest_csv):
-    if not os.path.exists(filename):
+def load_tickers_with_filter(filename, backtest_csv, stock_list=None, backtest_results=None):
+    if stock_list is None and not os.path.exists(filename):
         print(f"❌ Error: {filename} not found.")
         return []
 
     try:
-        if filename.endswith('.xlsx'):
-            df_master = pd.read_excel(filename)
+        if stock_list is not None:
+            df_master = stock_list
         else:
-            df_master = pd.read_csv(filename)
-        df_master.columns = df_master.columns.str.strip()
+            df_master = market_data.load_stock_list(filename)
     except Exception as e:
         print(f"❌ Read Error: {e}")
         return []
@@ -48,9 +51,10 @@ def load_tickers_with_filter(filename, backtest_csv):
         return []
     all_tickers = [str(code) + ".JK" for code in df_master['Code'].tolist()]
 
-    if os.path.exists(backtest_csv):
+    if backtest_results is not None or os.path.exists(backtest_csv):
         try:
-            df_bt = pd.read_csv(backtest_csv)
+            df_bt = backtest_results if backtest_results is not None else pd.read_csv(
+                backtest_csv)
             good_stocks = df_bt[(df_bt['WinRate'] >= MIN_WIN_RATE) & (
                 df_bt['Trades'] >= MIN_TRADES)]
             for _, row in good_stocks.iterrows():
@@ -66,28 +70,44 @@ def load_tickers_with_filter(filename, backtest_csv):
         return all_tickers
 
 
-def get_data(ticker):
+def load_history(ticker, history=None):
+    """2y of OHLCV bars with a tz-naive index (from the shared panel when given)."""
+    if history is not None:
+        df = market_data.trim_period(history, "2y")
+    else:
+        df = market_data.get_history(ticker, period="2y")
+    if df is None or df.empty:
+        return None
+    if df.index.tz is not None:
+        df.index = df.index.tz_localize(None)
+    return df
+
+
+def get_data(ticker, history=None, features=DEEP_DIVE_FEATURES):
+    """Full indicator series over 2y (used for charts), from the shared feature store."""
     try:
-        df = yf.Ticker(ticker).history(period="2y", interval="1d")
-        if df.empty:
+        df = load_history(ticker, history)
+        if df is None:
             return None
-        if df.index.tz is not None:
-            df.index = df.index.tz_localize(None)
-
-        df.ta.stochrsi(length=14, rsi_length=14, k=3, d=3, append=True)
-        df.ta.adx(length=14, append=True)
-        df.ta.sma(length=200, append=True)
-        df.ta.ema(length=50, append=True)
-        df.ta.rsi(length=14, append=True)
-        df.ta.macd(fast=12, slow=26, signal=9, append=True)
-        df.ta.bbands(length=20, std=2, append=True)
-        df['VOL_SMA_20'] = df['Volume'].rolling(window=20).mean()
-        return df
+
+        return feature_store.get_features(ticker, df, features)
     except:
         return None
 
 
-def calculate_fibonacci(df, lookback=120):
+def get_latest(ticker, history=None):
+    """Last bars with indicators for the newest two rows, updated incrementally from persisted state."""
+    try:
+        df = load_history(ticker, history)
+        if df is None or len(df) < 2:
+            return None
+        return indicator_state.latest_frame(ticker, df, bars=FIB_LOOKBACK)
+    except Exception as e:
+        print(f"⚠️ Indicator state error for {ticker}: {e}")
+        return None
+
+
+def calculate_fibonacci(df, lookback=FIB_LOOKBACK):
     recent = df.tail(lookback)
     high = float(recent['High'].max())
     low = float(recent['Low'].min())
@@ -227,28 +247,7 @@ def strategy_deep_dive(df, ticker):
     }
 
 
-def generate_chart(df, ticker, data):
-    mc = mpf.make_marketcolors(up='#2ebd85', down='#f6465d', inherit=True)
-    s = mpf.make_mpf_style(base_mpf_style='nightclouds', marketcolors=mc)
-    ap_stoch = mpf.make_addplot(
-        df['STOCHRSIk_14_14_3_3'], panel=1, color='cyan', ylabel='Stoch')
-    ap_sma = mpf.make_addplot(df['SMA_200'], color='gold', width=1.5)
-    fib = data['fib']
-    hlines = [data['entry'], data['tp'], data['sl'], fib['0.618']]
-    colors = ['white', 'green', 'red', 'lime']
-    filename = f"chart_{ticker}.png"
-    try:
-        mpf.plot(df, type='candle', style=s, title=f"{ticker} - Analysis", ylabel='IDR',
-                 addplot=[ap_stoch, ap_sma],
-                 hlines=dict(hlines=hlines, colors=colors,
-                             linewidths=[1]*4, linestyle='dashed'),
-                 volume=False, savefig=dict(fname=filename, dpi=100, pad_inches=0.25))
-    except:
-        return None
-    return filename
-
-
-def send_discord_alert(data, chart_path):
+def send_discord_alert(data, chart_png):
     if "WAIT" in data['signal']:
         return
 
@@ -312,41 +311,65 @@ Risk  : Rp {data['pnl']['loss']:,.0f} (2%)
             "footer": {"text": f"Dianalisa pada {datetime.now().strftime('%H:%M')} WIB"}
         }]
     }
-    if chart_path and os.path.exists(chart_path):
-        with open(chart_path, "rb") as f:
-            requests.post(DISCORD_WEBHOOK_URL, data={
-                          "payload_json": json.dumps(embed)}, files={"file": f})
-    else:
-        requests.post(DISCORD_WEBHOOK_URL, data={
-                      "payload_json": json.dumps(embed)})
+    get_dispatcher().submit(embed, chart_png, filename=f"chart_{data['ticker']}.png",
+                            url=DISCORD_WEBHOOK_URL)
 
 
-def run_bot():
+def run_bot(stock_list=None, histories=None, backtest_results=None):
     print("🚀 Starting Risk-Aware Scanner...")
-    tickers = load_tickers_with_filter(STOCK_LIST_FILE, BACKTEST_FILE)
+    tickers = load_tickers_with_filter(
+        STOCK_LIST_FILE, BACKTEST_FILE, stock_list, backtest_results)
     if not tickers:
         return
     print(f"🔎 Scanning {len(tickers)} stocks... (Ctrl+C to stop)")
+    metrics = RunMetrics("deep_dive")
+    charts = get_chart_pool()
+    pending = []  # (strategy, chart future) until the charts finish rendering
     hits = 0
     for idx, ticker in enumerate(tickers):
         print(f"   [{idx+1}/{len(tickers)}] {ticker}...", end="\r")
+        metrics.ticker_done()
         try:
-            df = get_data(ticker)
+            history = histories.get(ticker) if histories else None
+            with metrics.span("indicators", ticker):
+                df = get_latest(ticker, history)
             if df is None:
+                metrics.count("skipped", "no_data")
                 continue
-            strat = strategy_deep_dive(df, ticker)
+            metrics.record_frame(ticker, df)
+            with metrics.span("deep_dive", ticker):
+                strat = strategy_deep_dive(df, ticker)
             if "BUY" in strat['signal'] or "SETUP" in strat['signal']:
                 print(f"\n✨ ANALYSIS: {ticker} -> Score: {strat['score']}")
-                chart_file = generate_chart(df.tail(150), ticker, strat)
-                send_discord_alert(strat, chart_file)
-                if chart_file and os.path.exists(chart_file):
-                    os.remove(chart_file)
+                # Charts need full indicator series: recompute only for hits.
+                # A chart failure must not cost the alert: it then goes out without one.
+                chart = None
+                try:
+                    with metrics.span("chart_data", ticker):
+                        chart_df = get_data(ticker, history, CHART_FEATURES)
+                    if chart_df is not None:
+                        chart = metrics.time_future(
+                            "chart", charts.submit_deep_dive(ticker, chart_df.tail(150), strat), ticker)
+                except Exception as e:
+                    print(f"⚠️ Chart error for {ticker}: {e}")
+                if chart is None:
+                    metrics.count("chart", "missing")
+                pending.append((strat, chart))
                 hits += 1
-                time.sleep(2)
         except Exception as e:
+            metrics.count("skipped", "error")
             continue
 
+    for strat, chart in pending:
+        png = chart_bytes(chart, strat['ticker']) if chart is not None else None
+        with metrics.span("discord", strat['ticker']):
+            send_discord_alert(strat, png)
+    metrics.count("signals", "sent", hits)
+
     print(f"\n✅ Scan Complete. Sent {hits} detailed reports.")
+    with metrics.span("discord_flush"):
+        get_dispatcher().flush()
+    metrics.finish()
 
 
 if __name__ == "__main__":
@@ -1,13 +1,17 @@
-from config.settings import STOCK_LIST_FILE, MODEL_PATH, LOOKBACK_DAYS
+from config.settings import STOCK_LIST_FILE, MODEL_PATH, MODEL_WEIGHTS_PATH, LOOKBACK_DAYS, BACKTEST_WORKERS, BACKTEST_FILE, \
+    EXIT_MODE
 from services import market_data, technical_analysis, ai_engine
+from services.lstm_inference import NumpyLSTMModel
+from services.metrics import RunMetrics
 import sys
 import os
 import logging
 import random
+import time
+import multiprocessing
 import pandas as pd
 import numpy as np
-import tensorflow as tf
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ProcessPoolExecutor
 
 # Add src to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
@@ -15,17 +19,21 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 # Config
 TEST_DAYS = 365  # Look back 1 year
-SIMULATION_TICKS = 20  # Simulate trading on 20 random stocks
+SIMULATION_TICKS = None  # None = full universe, or N random stocks
 AI_THRESHOLD = 0.75
 
 logging.basicConfig(level=logging.INFO, format='%(message)s')
 
 
-def run_simulation(ticker, model):
-    """Simulates trading on a single stock over the past year."""
+def run_simulation(ticker, model, df=None, metrics=None):
+    """Simulates trading on a single stock over the past year (stage timings go to `metrics` when given)."""
+    if metrics is None:
+        metrics = RunMetrics("simulation")  # Throwaway: standalone calls don't export
     try:
-        # Get long history
-        df = market_data.get_market_data(ticker, period="2y")
+        # Get long history (unless the caller already fetched it)
+        if df is None:
+            with metrics.span("fetch", ticker):
+                df = market_data.get_market_data(ticker, period="2y")
         if df is None:
             # print(f"Skipping {ticker}: No Data")
             return None
@@ -34,81 +42,77 @@ def run_simulation(ticker, model):
             # print(f"Skipping {ticker}: Not enough data ({len(df)} rows)")
             return None
 
+        metrics.record_frame(ticker, df)
+
         # Slice simulation period
         sim_data = df.iloc[-(TEST_DAYS + LOOKBACK_DAYS):]
 
         capital = 10000000  # 10 Million IDR
         balance = capital
-        full_log = []
         trades = []
-        in_position = False
-        entry_price = 0
-        entry_date = None
-        stop_loss = 0
-        target_price = 0
 
         # print(f"[{ticker}] Data OK. Simulating {len(sim_data)-LOOKBACK_DAYS} days...")
 
-        # Iterate day by day
-        for i in range(LOOKBACK_DAYS, len(sim_data)):
-            current_date = sim_data.index[i]
-            current_close = sim_data['Close'].iloc[i]
-
-            # Update Position
-            if in_position:
-                # Check Exit
-                if current_close <= stop_loss:
-                    pnl = (current_close - entry_price)/entry_price
-                    params = {'exit': current_close, 'result': 'LOSS',
-                              'pnl': pnl}
-                    trades.append(params)
-                    balance = balance * (1 + params['pnl'])
-                    in_position = False
-                    # print(f"  [{ticker}] SELL LOSS: {pnl:.2%}")
-                elif current_close >= target_price:
-                    pnl = (current_close - entry_price)/entry_price
-                    params = {'exit': current_close, 'result': 'WIN',
-                              'pnl': pnl}
-                    trades.append(params)
-                    balance = balance * (1 + params['pnl'])
-                    in_position = False
-                    # print(f"  [{ticker}] SELL WIN: {pnl:.2%}")
-                continue
-
-            # Check Entry
-            # 1. Prepare Window
-            window = sim_data.iloc[i-LOOKBACK_DAYS:i]
-
-            # 2. Tech Filters
-            passed, reason, filters = technical_analysis.check_filters(window)
-            if not passed:
-                continue
-
-            # 3. AI Score
-            score = ai_engine.get_lstm_score(model, window)
-
-            if score >= AI_THRESHOLD:
-                # BUY SIGNAL
-                setup = technical_analysis.calculate_trade_setup(window)
-                in_position = True
-                entry_price = current_close
-                entry_date = current_date
-                stop_loss = setup['sl']
-                target_price = setup['tp']
-                # print(f"  [{ticker}] BUY @ {entry_price} (Score: {score:.2f})")
+        # Pre-score every candidate day in one batch.
+        # Entry on day i uses the LOOKBACK_DAYS bars before it: filter row i-1, window i - LOOKBACK_DAYS.
+        with metrics.span("filters", ticker):
+            stages = technical_analysis.filter_series(sim_data, window=LOOKBACK_DAYS)
+            passed_days = np.zeros(len(sim_data), dtype=bool)
+            passed_days[LOOKBACK_DAYS:] = stages['passed'].to_numpy()[
+                LOOKBACK_DAYS-1:-1]
+
+        with metrics.span("lstm", ticker):
+            windows = ai_engine.sliding_windows(sim_data)
+            scores = np.zeros(len(sim_data))
+            candidate_days = np.flatnonzero(passed_days)
+            if len(candidate_days):
+                scores[candidate_days] = ai_engine.score_sliding_windows(
+                    model, windows, candidate_days - LOOKBACK_DAYS)
+        metrics.count("candidate_days", "passed_filters", len(candidate_days))
+
+        with metrics.span("simulate", ticker):
+            # Resolve every signal's exit at once, then hold one position at a time:
+            # the next trade is the first signal after the previous exit bar
+            entries = np.flatnonzero(passed_days & (scores >= AI_THRESHOLD))
+            _, sl, tp = technical_analysis.trade_levels(sim_data)
+            exits = technical_analysis.resolve_exits(
+                entries, sl[entries], tp[entries], sim_data['High'], sim_data['Low'], sim_data['Close'],
+                sim_data['Open'], mode=EXIT_MODE)
+            close = sim_data['Close'].to_numpy()
+
+            next_free = 0
+            for k, i in enumerate(entries):
+                if i < next_free:
+                    continue
+                if exits['exit_idx'][k] < 0:
+                    break  # Still open at the end of the test period
+                entry_price = close[i]
+                pnl = (exits['exit_price'][k] - entry_price)/entry_price
+                trades.append({'exit': exits['exit_price'][k], 'result': str(exits['outcome'][k]),
+                               'pnl': pnl})
+                balance = balance * (1 + pnl)
+                next_free = exits['exit_idx'][k] + 1
 
         # Stats
         wins = len([t for t in trades if t['result'] == 'WIN'])
         losses = len([t for t in trades if t['result'] == 'LOSS'])
+        metrics.count("trades", "win", wins)
+        metrics.count("trades", "loss", losses)
         total = wins + losses
         win_rate = (wins / total * 100) if total > 0 else 0
         final_return = (balance - capital) / capital * 100
 
+        # Max Drawdown on the closed-trade equity curve
+        equity = capital * np.cumprod([1 + t['pnl'] for t in trades])
+        peaks = np.maximum.accumulate(np.concatenate(([capital], equity)))
+        max_dd = float(((equity - peaks[1:]) / peaks[1:]).min() * 100) if len(equity) else 0.0
+
         return {
             'ticker': ticker,
             'trades': total,
             'win_rate': win_rate,
-            'return': final_return
+            'return': final_return,
+            'max_dd': max_dd
         }
 
     except Exception as e:
@@ -116,33 +120,79 @@ def run_simulation(ticker, model):
         return None
 
 
-def main():
-    print(f"🚀 Starting Backtest Simulation (Threshold {AI_THRESHOLD})...")
+# Per-process model handle, set once by _init_worker
+_worker_model = None
 
-    # Load Model
-    model = ai_engine.load_model()
-    if not model:
-        print("Error: Model not found. Train it first using src/main.py")
-        return
 
-    # Load Tickers
-    tickers = market_data.load_tickers(STOCK_LIST_FILE)
-    if not tickers:
-        print("Error: No tickers found.")
-        return
+def _init_worker(model):
+    """Process-pool initializer: keeps the parent's NumPy model for this worker's simulations."""
+    global _worker_model
+    logging.getLogger().setLevel(logging.WARNING)
+    _worker_model = model
 
-    # Select Random Sample (Prioritize known good stocks for verification)
-    sample = random.sample(tickers, min(len(tickers), SIMULATION_TICKS))
 
-    print(f"Testing on {len(sample)} stocks over past {TEST_DAYS} days...")
+def _simulate_in_worker(job):
+    """Process-pool task: simulates one (ticker, df) job with the worker's model; returns (result, metrics snapshot)."""
+    ticker, df = job
+    metrics = RunMetrics("backtest")
+    return run_simulation(ticker, _worker_model, df, metrics), metrics.snapshot()
 
-    results = []
-    for ticker in sample:
-        print(f"Testing {ticker}...", end="\r")
-        res = run_simulation(ticker, model)
-        if res:
-            results.append(res)
 
+def run_backtest(frames, workers=BACKTEST_WORKERS, model=None):
+    """
+    Runs run_simulation for every {ticker: df} entry, sharded across a process pool.
+    Results come back in the input ticker order regardless of which worker finished first.
+    """
+    jobs = list(frames.items())
+    results = []
+    metrics = RunMetrics("backtest")
+
+    # Loaded once here: workers get a copy instead of each loading (and possibly re-exporting) it
+    if model is None:
+        with metrics.span("model"):
+            model = ai_engine.load_model()
+    if model is None:
+        logging.error("Backtest aborted: no model could be loaded")
+        return []
+
+    if workers <= 1 or len(jobs) <= 1:
+        for i, (ticker, df) in enumerate(jobs):
+            print(f"Testing {ticker} [{i+1}/{len(jobs)}]...", end="\r")
+            results.append(run_simulation(ticker, model, df, metrics))
+            metrics.ticker_done()
+    else:
+        # spawn (not fork): TensorFlow state is not fork-safe
+        ctx = multiprocessing.get_context("spawn")
+        chunksize = max(1, len(jobs) // (workers * 4))
+        # The NumPy engine pickles cheaply; a Keras fallback is converted to it in memory
+        shared_model = model
+        if model is not None and not isinstance(model, NumpyLSTMModel):
+            shared_model = NumpyLSTMModel(ai_engine.numpy_layers(model))
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                                 initializer=_init_worker, initargs=(shared_model,)) as pool:
+            for i, (res, snapshot) in enumerate(pool.map(_simulate_in_worker, jobs, chunksize=chunksize)):
+                print(f"Testing {jobs[i][0]} [{i+1}/{len(jobs)}]...", end="\r")
+                results.append(res)
+                metrics.merge(snapshot)
+                metrics.ticker_done()
+
+    metrics.finish()
+    return [r for r in results if r]
+
+
+def results_frame(results):
+    """Per-ticker stats in the layout analytics.load_tickers_with_filter expects."""
+    return pd.DataFrame([{
+        'Ticker': r['ticker'],
+        'Trades': r['trades'],
+        'WinRate': r['win_rate'],
+        'ROI': r['return'],
+        'MaxDD': r['max_dd']
+    } for r in results], columns=['Ticker', 'Trades', 'WinRate', 'ROI', 'MaxDD'])
+
+
+def print_report(results):
+    """Prints the simulation table and saves per-ticker stats to BACKTEST_FILE."""
     print("\n\n📊 SIMULATION RESULTS")
     print("="*40)
     print(f"{'Ticker':<10} {'Trades':<8} {'Win Rate':<10} {'Return':<10}")
@@ -165,6 +215,37 @@ def main():
     else:
         print("No trades triggered.")
 
+    try:
+        results_frame(results).to_csv(BACKTEST_FILE, index=False)
+    except Exception as e:
+        logging.error(f"Failed to save backtest results: {e}")
+
+
+def main():
+    print(f"🚀 Starting Backtest Simulation (Threshold {AI_THRESHOLD})...")
+
+    # Model is loaded once in run_backtest and handed to the workers; fail fast if there is none
+    if not (os.path.exists(MODEL_PATH) or os.path.exists(MODEL_WEIGHTS_PATH)):
+        print("Error: Model not found. Train it first using src/main.py")
+        return
+
+    # Load Tickers
+    tickers = market_data.load_tickers(STOCK_LIST_FILE)
+    if not tickers:
+        print("Error: No tickers found.")
+        return
+
+    # Full universe by default, or a random sample
+    sample = tickers
+    if SIMULATION_TICKS:
+        sample = random.sample(tickers, min(len(tickers), SIMULATION_TICKS))
+
+    print(f"Testing on {len(sample)} stocks over past {TEST_DAYS} days ({BACKTEST_WORKERS} workers)...")
+
+    frames = market_data.get_market_data_bulk(sample, period="2y")
+    results = run_backtest(frames)
+    print_report(results)
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,30 @@
+import sys
+import logging
+import time
+from config.settings import STOCK_LIST_FILE, UNIVERSE_DIR, MARKET_DATA_SOURCE
+from services import market_data, price_tensor
+
+# Configure Logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def build_universe(period="2y", tickers=None):
+    """Fetches the universe's bars (price store + Yahoo, or the DB) and writes the memory-mapped panel."""
+    if tickers is None:
+        tickers = market_data.load_tickers(STOCK_LIST_FILE)
+    print(f"📥 Loading {period} of daily bars for {len(tickers)} stocks...")
+    # Never read the panel being rebuilt: use the DB when scans run from it, else price store + Yahoo
+    source = "db" if MARKET_DATA_SOURCE == "db" else "yahoo"
+    histories = market_data.get_history_bulk(tickers, period=period, source=source)
+
+    started = time.perf_counter()
+    count = price_tensor.write_tensor(histories)
+    print(f"✅ Wrote {count} stocks to {UNIVERSE_DIR} in {time.perf_counter() - started:.1f}s. "
+          f"Set MARKET_DATA_SOURCE=universe to scan from it.")
+    return count
+
+
+if __name__ == "__main__":
+    # Usage: python src/build_universe.py [PERIOD]   (default 2y; rebuild after the daily top-up)
+    build_universe(sys.argv[1] if len(sys.argv) > 1 else "2y")
@@ -14,6 +14,8 @@ load_dotenv(os.path.join(BASE_DIR, ".env"))
 
 MODEL_FILENAME = "wyckoff_lstm.keras"
 MODEL_PATH = os.path.join(BASE_DIR, MODEL_FILENAME)
+# NumPy export of the same weights (TensorFlow-free inference)
+MODEL_WEIGHTS_PATH = os.path.join(BASE_DIR, "wyckoff_lstm.npz")
 RETRAIN_INTERVAL_DAYS = int(os.getenv("RETRAIN_INTERVAL_DAYS", 1))
 
 # --- SCREENER FILTERS ---
@@ -24,6 +26,22 @@ LOW_PCT_THRESHOLD = float(os.getenv("LOW_PCT_THRESHOLD", 0.35))
 MIN_PRICE = int(os.getenv("MIN_PRICE", 200))
 MIN_AVG_VOLUME = int(os.getenv("MIN_AVG_VOLUME", 1000000))
 
+# --- BACKTEST ---
+BACKTEST_WORKERS = int(os.getenv("BACKTEST_WORKERS", os.cpu_count() or 1))
+# Per-ticker backtest stats, read by the deep-dive scanner (analytics.py)
+BACKTEST_FILE = os.getenv("BACKTEST_FILE", "backtest_results.csv")
+if not os.path.isabs(BACKTEST_FILE):
+    BACKTEST_FILE = os.path.join(BASE_DIR, BACKTEST_FILE)
+# How a bar closes a trade: close (Close vs SL/TP) | stop_first / target_first (intrabar High/Low,
+# the named side filling first when a bar spans both)
+EXIT_MODE = os.getenv("EXIT_MODE", "close")
+# Portfolio backtest (src/portfolio_backtest.py): broker fees per side (sell includes the 0.1% IDX tax)
+FEE_BUY = float(os.getenv("FEE_BUY", 0.0015))
+FEE_SELL = float(os.getenv("FEE_SELL", 0.0025))
+PORTFOLIO_FILE = os.getenv("PORTFOLIO_FILE", "portfolio_equity.csv")
+if not os.path.isabs(PORTFOLIO_FILE):
+    PORTFOLIO_FILE = os.path.join(BASE_DIR, PORTFOLIO_FILE)
+
 # --- MONEY MANAGEMENT ---
 CAPITAL_IDR = int(os.getenv("CAPITAL_IDR", 1400000))
 RISK_PCT = float(os.getenv("RISK_PCT", 0.02))
@@ -35,5 +53,62 @@ STOCK_LIST_FILE = os.getenv("STOCK_LIST_FILE", "Stock_List.xlsx")
 if not os.path.isabs(STOCK_LIST_FILE):
     STOCK_LIST_FILE = os.path.join(BASE_DIR, STOCK_LIST_FILE)
 
+# --- MARKET DATA CACHE ---
+MARKET_TZ = "Asia/Jakarta"
+DATA_DIR = os.getenv("DATA_DIR", os.path.join(BASE_DIR, "data"))
+if not os.path.isabs(DATA_DIR):
+    DATA_DIR = os.path.join(BASE_DIR, DATA_DIR)
+PRICE_STORE_DIR = os.path.join(DATA_DIR, "prices")
+# Indicator columns computed once per ticker per bar and shared by every script
+FEATURE_STORE_DIR = os.path.join(DATA_DIR, "features")
+USE_FEATURE_STORE = os.getenv("USE_FEATURE_STORE", "true").lower() == "true"
+# Per-ticker incremental indicator state (deep-dive scanner)
+INDICATOR_STATE_DIR = os.path.join(DATA_DIR, "indicators")
+USE_PRICE_STORE = os.getenv("USE_PRICE_STORE", "true").lower() == "true"
+# Where scans read bars from: yahoo (price store + Yahoo top-ups) | db (daily_prices table)
+# | universe (memory-mapped panel written by src/build_universe.py)
+MARKET_DATA_SOURCE = os.getenv("MARKET_DATA_SOURCE", "yahoo")
+UNIVERSE_DIR = os.path.join(DATA_DIR, "universe")
+# Memory-lean screener frames: float32 prices, only the derived columns a caller asks for
+LEAN_FRAMES = os.getenv("LEAN_FRAMES", "false").lower() == "true"
+# Symbols per multi-ticker Yahoo request in universe scans
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", 100))
+
+# Fundamentals (market cap, PER, PBV, ROE) barely move intraday
+FUNDAMENTALS_FILE = os.path.join(DATA_DIR, "fundamentals.json")
+FUNDAMENTALS_TTL_HOURS = float(os.getenv("FUNDAMENTALS_TTL_HOURS", 24))
+FUNDAMENTALS_WORKERS = int(os.getenv("FUNDAMENTALS_WORKERS", 8))  # Concurrent prefetch requests
+
+# --- ASYNC FETCH (FETCH_BACKEND=async) ---
+FETCH_BACKEND = os.getenv("FETCH_BACKEND", "yfinance")  # yfinance | async
+YAHOO_CHART_URL = os.getenv(
+    "YAHOO_CHART_URL", "https://query1.finance.yahoo.com/v8/finance/chart")
+FETCH_CONCURRENCY = int(os.getenv("FETCH_CONCURRENCY", 8))
+FETCH_RATE = float(os.getenv("FETCH_RATE", 4))  # Starting requests/sec
+FETCH_MIN_RATE = float(os.getenv("FETCH_MIN_RATE", 0.5))
+FETCH_MAX_RATE = float(os.getenv("FETCH_MAX_RATE", 20))
+FETCH_TIMEOUT = float(os.getenv("FETCH_TIMEOUT", 10))  # Seconds per request
+FETCH_MAX_RETRIES = int(os.getenv("FETCH_MAX_RETRIES", 3))
+
+# --- STREAMING SCANNER (main.py --stream) ---
+STREAM_BATCH_MS = int(os.getenv("STREAM_BATCH_MS", 200))  # Micro-batch window for bar updates
+STREAM_REPLAY_DELAY = float(os.getenv("STREAM_REPLAY_DELAY", 0))  # Seconds between replayed bars
+STREAM_FLUSH_SECONDS = float(os.getenv("STREAM_FLUSH_SECONDS", 60))  # Max age of unsaved hits before a DB write
+
+# --- RUN METRICS ---
+# Per-run JSON report and Prometheus textfile (point node_exporter's textfile collector here)
+METRICS_DIR = os.getenv("METRICS_DIR", os.path.join(DATA_DIR, "metrics"))
+if not os.path.isabs(METRICS_DIR):
+    METRICS_DIR = os.path.join(BASE_DIR, METRICS_DIR)
+
+# --- CHARTS ---
+# Chart render processes (0 renders inline in the calling process)
+CHART_WORKERS = int(os.getenv("CHART_WORKERS", 2))
+
 # --- DISCORD ---
 DISCORD_WEBHOOK_URL = os.getenv("DISCORD_WEBHOOK_Result", "")
+DISCORD_WEBHOOK_DAILY_URL = os.getenv("DISCORD_WEBHOOK_Daily", DISCORD_WEBHOOK_URL)
+DISCORD_QUEUE_SIZE = int(os.getenv("DISCORD_QUEUE_SIZE", 100))  # Pending alerts before scans block
+DISCORD_MAX_RETRIES = int(os.getenv("DISCORD_MAX_RETRIES", 5))
+DISCORD_TIMEOUT = float(os.getenv("DISCORD_TIMEOUT", 15))
+DISCORD_EXIT_TIMEOUT = float(os.getenv("DISCORD_EXIT_TIMEOUT", 30))  # Max wait for queued alerts at exit
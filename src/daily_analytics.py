@@ -1,29 +1,23 @@
 import pandas as pd
-import yfinance as yf
-import pandas_ta as ta
 import numpy as np
 import os
-import requests
-import json
 import time
 from datetime import datetime
-import ai_utils
-import consts
+from config.settings import DISCORD_WEBHOOK_DAILY_URL, STOCK_LIST_FILE
+from services import market_data, ai_engine, feature_store
+from services.dispatcher import get_dispatcher
+from services.metrics import RunMetrics
 
 # --- CONFIGURATION ---
-DISCORD_WEBHOOK_URL = consts.DISCORD_WEBHOOK_Daily
-STOCK_LIST_FILE = consts.STOCK_LIST_FILE
+DISCORD_WEBHOOK_URL = DISCORD_WEBHOOK_DAILY_URL
+DAILY_FEATURES = ['SMA_200', 'EMA_50', 'RSI_14', 'BBANDS_20_2', 'VOL_SMA_20']
 
 
-def load_tickers(filename):
-    if not os.path.exists(filename):
+def load_tickers(filename, stock_list=None):
+    if stock_list is None and not os.path.exists(filename):
         return []
     try:
-        if filename.endswith('.xlsx'):
-            df = pd.read_excel(filename)
-        else:
-            df = pd.read_csv(filename)
-        df.columns = df.columns.str.strip()
+        df = stock_list if stock_list is not None else market_data.load_stock_list(filename)
 
         valid_boards = ['Main', 'Development', 'Ekonomi Baru']
         if 'Listing Board' in df.columns:
@@ -35,30 +29,26 @@ def load_tickers(filename):
         return {}
 
 
-def get_data(ticker):
+def get_data(ticker, history=None):
     try:
-        df = yf.Ticker(ticker).history(period="1y", interval="1d")
-        if df.empty or len(df) < 50:
+        if history is not None:
+            df = market_data.trim_period(history, "1y")
+        else:
+            df = market_data.get_history(ticker, period="1y")
+        if df is None or len(df) < 50:
             return None
         if df.index.tz is not None:
             df.index = df.index.tz_localize(None)
 
-        # Basic Indicators
-        df.ta.sma(length=200, append=True)
-        df.ta.ema(length=50, append=True)
-        df.ta.rsi(length=14, append=True)
-        df.ta.bbands(length=20, std=2, append=True)
-
-        # Volume MA
-        df['VOL_SMA_20'] = df['Volume'].rolling(window=20).mean()
-
-        return df
+        # Basic Indicators + Volume MA (shared with the other scanners via the feature store)
+        return feature_store.get_features(ticker, df, DAILY_FEATURES)
     except:
         return None
 
 
-def analyze_market_health(ticker_dict):
+def analyze_market_health(ticker_dict, histories=None, model=None):
     print(f"📊 Analyzing Market Health ({len(ticker_dict)} stocks)...")
+    metrics = RunMetrics("market_brief")
 
     stats = {
         'total': 0,
@@ -74,9 +64,14 @@ def analyze_market_health(ticker_dict):
     processed = 0
     for ticker, name in ticker_dict.items():
         print(f"   Scanning {ticker}...", end="\r")
-        df = get_data(ticker)
+        metrics.ticker_done()
+        with metrics.span("indicators", ticker):
+            df = get_data(ticker, histories.get(ticker) if histories else None)
         if df is None:
+            metrics.count("skipped", "no_data")
             continue
+        metrics.record_frame(ticker, df)
+        stats_started = time.perf_counter()
 
         curr = df.iloc[-1]
         close = curr['Close']
@@ -118,27 +113,37 @@ def analyze_market_health(ticker_dict):
         if close > sma200 and abs(close - ema50)/close < 0.02:
             stats['watchlist'].append(ticker)
 
+        metrics.observe("stats", time.perf_counter() - stats_started, ticker)
         processed += 1
 
     # --- AI MARKET ANALYSIS ---
     # We analyze a representative ticker (e.g., COMPOSITE or a major bank like BBCA if Index not available)
     # Using 'BBCA.JK' as a market proxy for AI scoring since Indices might not have Volume.
     print("🧠 Running AI Market Assessment...")
+    ai_started = time.perf_counter()
     try:
-        model = ai_utils.train_model()  # In production, load saved model
-        market_proxy = yf.Ticker("BBCA.JK").history(period="1y")
-        if not market_proxy.empty:
-            ai_score = ai_utils.get_lstm_score(model, market_proxy)
+        if model is None:
+            model = ai_engine.load_model()
+        if model is None:
+            model = ai_engine.train_model()
+        if histories and "BBCA.JK" in histories:
+            market_proxy = market_data.trim_period(histories["BBCA.JK"], "1y")
+        else:
+            market_proxy = market_data.get_history("BBCA.JK", period="1y")
+        if market_proxy is not None:
+            ai_score = ai_engine.get_lstm_score(model, market_proxy)
             stats['ai_score'] = ai_score
     except Exception as e:
         print(f"AI Error: {e}")
+    metrics.observe("ai", time.perf_counter() - ai_started)
 
     print("\n✅ Analysis Complete.")
+    metrics.finish()
     return stats
 
 
 def send_daily_brief(stats):
-    if stats['total'] == 0:
+    if stats['total'] == 0 or not DISCORD_WEBHOOK_URL:
         return
 
     # Calculate Market Breadth
@@ -189,8 +194,7 @@ def send_daily_brief(stats):
         }]
     }
 
-    requests.post(DISCORD_WEBHOOK_URL, data={
-                  "payload_json": json.dumps(embed)})
+    get_dispatcher().submit(embed, url=DISCORD_WEBHOOK_URL)
 
 
 if __name__ == "__main__":
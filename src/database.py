@@ -1,6 +1,7 @@
 import os
 import logging
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, Date, ForeignKey, BigInteger
+from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, Date, ForeignKey, BigInteger, UniqueConstraint, Index
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import declarative_base, sessionmaker, relationship
 from datetime import datetime
 from dotenv import load_dotenv
@@ -9,6 +10,8 @@ from dotenv import load_dotenv
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
+# Scan results buffered before ScanResultWriter writes a batch
+SCAN_WRITE_BATCH = int(os.getenv("SCAN_WRITE_BATCH", 500))
 
 # If no DB URL is set, we warn but don't crash immediately (screener can still run text-only)
 if not DATABASE_URL:
@@ -36,6 +39,10 @@ class DailyPrice(Base):
 
     # TimescaleDB Hypertable
     # Note: No primary key on ID because TimescaleDB partitions by time
+    # Scans read one ticker's (or the universe's) window: ticker-first range index
+    __table_args__ = (
+        Index('ix_daily_prices_ticker_time', 'ticker', 'time'),
+    )
 
     time = Column(DateTime, nullable=False, primary_key=True)
     ticker = Column(String, ForeignKey('stocks.ticker'),
@@ -52,6 +59,11 @@ class DailyPrice(Base):
 
 class ScreenerResult(Base):
     __tablename__ = 'screener_results'
+    # One row per ticker per scan (scan_date is stamped once per scan)
+    __table_args__ = (
+        UniqueConstraint('scan_date', 'ticker',
+                         name='uq_screener_results_scan_ticker'),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     scan_date = Column(DateTime, default=datetime.now)
@@ -93,3 +105,71 @@ def get_db():
             db.close()
     else:
         yield None
+
+
+def dialect_insert(table):
+    """Dialect INSERT that supports ON CONFLICT DO NOTHING (Postgres / SQLite)."""
+    if engine.dialect.name == "postgresql":
+        return postgresql.insert(table)
+    return sqlite.insert(table)
+
+
+class ScanResultWriter:
+    """
+    Collects screener hits for one scan and writes them in batches.
+
+    Each batch is one transaction: stocks are upserted (ON CONFLICT DO NOTHING) and
+    screener_results bulk-inserted, skipping any (scan_date, ticker) already stored.
+    Without a configured database, results are dropped silently.
+    """
+
+    def __init__(self, scan_date=None, batch_size=SCAN_WRITE_BATCH):
+        self.scan_date = scan_date or datetime.now()
+        self.batch_size = batch_size
+        self.pending = {}
+        self.written = 0
+
+    def add(self, ticker, score, filters, phase="Accumulation", status="NEW", scan_date=None):
+        """Buffers one result (a repeated ticker within the scan keeps its first result)."""
+        if engine is None or ticker in self.pending:
+            return
+        self.pending[ticker] = {
+            "scan_date": scan_date or self.scan_date,
+            "ticker": ticker,
+            "score": float(score),
+            "phase": phase,
+            "volatility": float(filters['volatility']),
+            "dist_from_low": float(filters['dist_from_low']),
+            "status": status,
+        }
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Writes buffered results in a single transaction."""
+        if not self.pending:
+            return
+        rows = list(self.pending.values())
+        stocks = [{"ticker": r["ticker"], "name": r["ticker"], "sector": "Unknown"}
+                  for r in rows]
+        try:
+            with engine.begin() as conn:
+                conn.execute(dialect_insert(Stock.__table__).on_conflict_do_nothing(
+                    index_elements=['ticker']), stocks)
+                conn.execute(dialect_insert(ScreenerResult.__table__).on_conflict_do_nothing(
+                    index_elements=['scan_date', 'ticker']), rows)
+            self.written += len(rows)
+            logging.info(f"💾 Saved {len(rows)} scan results to database.")
+        except Exception as e:
+            logging.error(f"Failed to save to DB: {e}")
+        finally:
+            self.pending.clear()
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,34 @@
+import sys
+import logging
+from config.settings import STOCK_LIST_FILE, BULK_CHUNK_SIZE
+from services import market_data, price_db
+
+# Configure Logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def ingest_prices(period="2y", tickers=None, chunk_size=BULK_CHUNK_SIZE):
+    """Fetches OHLCV bars (price store + Yahoo) and upserts them into daily_prices, one chunk per transaction."""
+    if tickers is None:
+        tickers = market_data.load_tickers(STOCK_LIST_FILE)
+    print(f"📥 Ingesting {period} of daily bars for {len(tickers)} stocks...")
+
+    total = 0
+    for i in range(0, len(tickers), chunk_size):
+        chunk = tickers[i:i + chunk_size]
+        # Always fetch from Yahoo: with MARKET_DATA_SOURCE=db this would read daily_prices back
+        histories = market_data.get_history_bulk(chunk, period=period, chunk_size=chunk_size, source="yahoo")
+        try:
+            total += price_db.write_prices(histories)
+        except Exception as e:
+            logging.error(f"Failed to ingest {len(chunk)} tickers ({chunk[0]}...): {e}")
+        print(f"   [{min(i + chunk_size, len(tickers))}/{len(tickers)}] {total:,} rows", end="\r")
+
+    print(f"\n✅ Ingestion Complete. Upserted {total:,} rows into daily_prices.")
+    return total
+
+
+if __name__ == "__main__":
+    # Usage: python src/ingest_prices.py [PERIOD]   (default 2y; daily cron can use 5d)
+    ingest_prices(sys.argv[1] if len(sys.argv) > 1 else "2y")
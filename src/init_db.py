@@ -1,4 +1,5 @@
 import logging
+from sqlalchemy import text
 from database import engine, Base
 
 if __name__ == "__main__":
@@ -10,7 +11,7 @@ if __name__ == "__main__":
             # 1. Enable TimescaleDB Extension (Needs Superuser usually, or pre-installed)
             with engine.connect() as connection:
                 connection.execute(
-                    "CREATE EXTENSION IF NOT EXISTS timescaledb CASCADE;")
+                    text("CREATE EXTENSION IF NOT EXISTS timescaledb CASCADE;"))
                 connection.commit()
                 print("✅ TimescaleDB extension enabled.")
         except Exception as e:
@@ -21,12 +22,22 @@ if __name__ == "__main__":
             Base.metadata.create_all(bind=engine)
             print("✅ Tables created successfully.")
 
+            # Tables created before these keys/indexes existed need them added
+            with engine.connect() as connection:
+                connection.execute(text(
+                    "CREATE UNIQUE INDEX IF NOT EXISTS uq_screener_results_scan_ticker "
+                    "ON screener_results (scan_date, ticker);"))
+                connection.execute(text(
+                    "CREATE INDEX IF NOT EXISTS ix_daily_prices_ticker_time "
+                    "ON daily_prices (ticker, time);"))
+                connection.commit()
+
             # 2. Convert to Hypertable
             with engine.connect() as connection:
                 # We interpret 'if not exists' via exception handling or ignore
                 try:
                     connection.execute(
-                        "SELECT create_hypertable('daily_prices', 'time', if_not_exists => TRUE);")
+                        text("SELECT create_hypertable('daily_prices', 'time', if_not_exists => TRUE);"))
                     connection.commit()
                     print("✅ 'daily_prices' converted to Hypertable.")
                 except Exception as e:
@@ -1,14 +1,16 @@
 import sys
 import logging
-import time
 import os
+import time
 from datetime import datetime
 
 # Services
-from services import market_data, technical_analysis, ai_engine, charting, notification
-from config.settings import STOCK_LIST_FILE, RETRAIN_INTERVAL_DAYS
+from services import market_data, technical_analysis, ai_engine, notification
+from services.chart_pool import ChartPool, chart_bytes, get_chart_pool
+from services.stream import StreamScanner, open_source
+from services.metrics import RunMetrics
+from config.settings import STOCK_LIST_FILE, RETRAIN_INTERVAL_DAYS, STREAM_FLUSH_SECONDS
 import database as database
-from database import Stock, ScreenerResult
 
 # Configure Logging
 logging.basicConfig(level=logging.INFO,
@@ -34,43 +36,8 @@ def check_model_freshness():
         return True
 
 
-def save_scan_result_to_db(ticker, score, filters):
-    """Saves the scan result to the database."""
-    db_gen = database.get_db()
-    db = next(db_gen, None)
-
-    if not db:
-        return
-
-    try:
-        # Ensure Stock exists
-        stock = db.query(Stock).filter(Stock.ticker == ticker).first()
-        if not stock:
-            stock = Stock(ticker=ticker, name=ticker, sector="Unknown")
-            db.add(stock)
-            db.commit()
-
-        # Create Result
-        result = ScreenerResult(
-            ticker=ticker,
-            score=float(score),
-            phase="Accumulation",
-            volatility=float(filters['volatility']),
-            dist_from_low=float(filters['dist_from_low']),
-            status="NEW"
-        )
-        db.add(result)
-        db.commit()
-        logging.info(f"💾 Saved {ticker} to database.")
-    except Exception as e:
-        logging.error(f"Failed to save to DB: {e}")
-    finally:
-        db.close()
-
-
-def run_screener(target_ticker=None, force_retrain=False):
-    print("🧠 Initializing Wyckoff AI...")
-
+def load_or_train_model(force_retrain=False):
+    """Loads the model, retraining it first if forced or expired."""
     # Auto-Retrain Check
     if not force_retrain and check_model_freshness():
         force_retrain = True
@@ -81,6 +48,20 @@ def run_screener(target_ticker=None, force_retrain=False):
 
     if model is None:
         model = ai_engine.train_model()
+    return model
+
+
+def run_screener(target_ticker=None, force_retrain=False, model=None, stock_list=None, histories=None):
+    """Runs the Wyckoff scan. model / stock_list / histories can be shared by the pipeline runner."""
+    print("🧠 Initializing Wyckoff AI...")
+    metrics = RunMetrics("screener")
+
+    if model is None:
+        with metrics.span("model"):
+            model = load_or_train_model(force_retrain)
+
+    # Single-ticker runs render inline; universe scans hand charts to the worker pool
+    charts = ChartPool(workers=0) if target_ticker else get_chart_pool()
 
     if target_ticker:
         # Normalize ticker
@@ -89,92 +70,193 @@ def run_screener(target_ticker=None, force_retrain=False):
             ticker = f"{ticker}.JK"
         tickers = [ticker]
         print(f"🔎 Scanning Single Target: {ticker}...")
+        with metrics.span("fetch"):
+            frames = {ticker: market_data.get_market_data(ticker)}
     else:
-        tickers = market_data.load_tickers(STOCK_LIST_FILE)
+        tickers = market_data.load_tickers(STOCK_LIST_FILE, stock_list)
+        with metrics.span("fetch"):
+            if histories is not None:
+                frames = {t: market_data.prepare_market_data(market_data.trim_period(h, "6mo"), t)
+                          for t, h in histories.items()}
+            else:
+                print(f"📥 Downloading price history for {len(tickers)} stocks...")
+                frames = market_data.get_market_data_bulk(tickers)
         print(f"🔎 Scanning {len(tickers)} stocks for Accumulation Patterns...")
 
-    hits = 0
+    # 1. Technical Filter (collect survivors for batched scoring)
+    survivors = {}
     for i, ticker in enumerate(tickers):
         print(f"   Scanning {ticker}...", end="\r")
-        df = market_data.get_market_data(ticker)
+        df = frames.get(ticker)
+        metrics.ticker_done()
 
         if df is None:
+            metrics.count("filter_rejections", "no_data")
             continue
 
-        # 1. Technical Filter
-        passed, reason, filters = technical_analysis.check_filters(df)
+        metrics.record_frame(ticker, df)
+        with metrics.span("filters", ticker):
+            passed, reason, filters = technical_analysis.check_filters(df)
         if not passed:
+            metrics.count("filter_rejections", technical_analysis.rejection_stage(reason))
             if target_ticker:
                 # Force generation of full report even on failure
                 trade_setup = technical_analysis.calculate_trade_setup(df)
-                chart_file = charting.generate_chart(
-                    df, ticker, filters, trade_setup)
+                chart = charts.submit(ticker, df, trade_setup, filters)
                 fundamentals = market_data.get_fundamentals(ticker)
 
                 # Send with NEGATIVE status
-                notification.send_alert(ticker, filters, 0.0, chart_file, trade_setup, fundamentals,
+                notification.send_alert(ticker, filters, 0.0, chart_bytes(chart, ticker), trade_setup, fundamentals,
                                         override_status="NEGATIVE", failure_reason=reason)
             continue
 
-        # 2. AI Scoring
-        score = ai_engine.get_lstm_score(model, df)
+        survivors[ticker] = (df, filters)
+
+    # 2. AI Scoring (one forward pass for every survivor)
+    with metrics.span("lstm"):
+        scores = ai_engine.score_batch(
+            model, {ticker: df for ticker, (df, _) in survivors.items()})
+
+    # Fundamentals for every candidate in one concurrent batch (cached for the day)
+    with metrics.span("fundamentals"):
+        market_data.prefetch_fundamentals(
+            [t for t in survivors if scores[t] >= 0.75])
+
+    results = database.ScanResultWriter()
+    hits = 0
+    pending = []  # (ticker, chart future, alert args) until the charts finish rendering
+    for ticker, (df, filters) in survivors.items():
+        score = scores[ticker]
 
         if score >= 0.75:
             print(
                 f"\n✨ FOUND {ticker}! Score: {score:.2f} | Low Dist: {filters['dist_from_low']:.2%}")
 
-            trade_setup = technical_analysis.calculate_trade_setup(df)
+            with metrics.span("trade_setup", ticker):
+                trade_setup = technical_analysis.calculate_trade_setup(df)
 
             # Lot Size Filter (Money Management)
             if trade_setup['lots'] < 3:
                 # print(f"   Skipped {ticker} (Small Position: {trade_setup['lots']} lots)")
+                metrics.count("candidates", "small_position")
                 continue
 
-            chart_file = charting.generate_chart(
-                df, ticker, filters, trade_setup)
-            fundamentals = market_data.get_fundamentals(ticker)
-
-            notification.send_alert(ticker, filters, score, chart_file,
-                                    trade_setup, fundamentals)
-
-            # Save to Database
-            save_scan_result_to_db(ticker, score, filters)
+            # Chart renders in a worker while fundamentals are fetched and the scan moves on
+            chart = metrics.time_future(
+                "chart", charts.submit(ticker, df, trade_setup, filters), ticker)
+            with metrics.span("fundamentals", ticker):
+                fundamentals = market_data.get_fundamentals(ticker)
+            pending.append((ticker, chart, (filters, score, trade_setup, fundamentals)))
 
-            # Save to Database
-            save_scan_result_to_db(ticker, score, filters)
+            # Save to Database (written in batches at the end of the scan)
+            results.add(ticker, score, filters)
 
             hits += 1
         else:
             if target_ticker:
                 print(f"   Skipped {ticker} (Score: {score:.2f})")
                 trade_setup = technical_analysis.calculate_trade_setup(df)
-                chart_file = charting.generate_chart(
-                    df, ticker, filters, trade_setup)
+                chart = charts.submit(ticker, df, trade_setup, filters)
                 fundamentals = market_data.get_fundamentals(ticker)
 
-                notification.send_alert(ticker, filters, score, chart_file, trade_setup, fundamentals,
+                notification.send_alert(ticker, filters, score, chart_bytes(chart, ticker), trade_setup, fundamentals,
                                         override_status="NEGATIVE", failure_reason=f"Low AI Score ({score:.2f})")
 
-        # Rate Limit Protection
-        time.sleep(0.5)
+    for ticker, chart, (filters, score, trade_setup, fundamentals) in pending:
+        png = chart_bytes(chart, ticker)
+        with metrics.span("discord", ticker):
+            notification.send_alert(ticker, filters, score, png, trade_setup, fundamentals)
+
+    with metrics.span("db"):
+        results.close()
+    metrics.count("candidates", "alerted", hits)
 
     print(f"\n✅ Scan Complete. Found {hits} candidates.")
     notification.send_scan_summary(len(tickers), hits)
+    with metrics.span("discord_flush"):
+        notification.flush()
+    metrics.finish()
+
+
+def run_stream(source, force_retrain=False, model=None, stock_list=None):
+    """Long-running intraday scan: seeds each ticker from daily bars, then re-scores tickers as bar updates arrive."""
+    print("🧠 Initializing Wyckoff AI...")
+    if model is None:
+        model = load_or_train_model(force_retrain)
+
+    tickers = market_data.load_tickers(STOCK_LIST_FILE, stock_list)
+    print(f"📥 Seeding {len(tickers)} stocks from daily history...")
+    frames = market_data.get_market_data_bulk(tickers)
+
+    charts = get_chart_pool()
+    results = database.ScanResultWriter()
+    pending = []  # (chart future, alert args) until the chart is rendered
+    last_flush = time.monotonic()
+
+    def send_ready(wait=False):
+        """Sends alerts whose charts are done (all of them with wait) and saves hits older than STREAM_FLUSH_SECONDS."""
+        nonlocal last_flush
+        for item in [p for p in pending if wait or p[0].done()]:
+            pending.remove(item)
+            chart, (ticker, filters, score, trade_setup, fundamentals) = item
+            notification.send_alert(ticker, filters, score, chart_bytes(chart, ticker), trade_setup, fundamentals)
+        if time.monotonic() - last_flush >= STREAM_FLUSH_SECONDS:
+            results.flush()
+            last_flush = time.monotonic()
+
+    def on_hit(ticker, buffer, filters, score):
+        print(
+            f"\n✨ FOUND {ticker}! Score: {score:.2f} | Low Dist: {filters['dist_from_low']:.2%}")
+        df = buffer.frame()
+        trade_setup = technical_analysis.calculate_trade_setup(df)
+
+        # Lot Size Filter (Money Management)
+        if trade_setup['lots'] < 3:
+            return
+
+        fundamentals = market_data.get_fundamentals(ticker)
+        # Alert goes out from the scan loop once the chart is rendered; scanning carries on meanwhile
+        pending.append((charts.submit(ticker, df, trade_setup, filters),
+                        (ticker, filters, score, trade_setup, fundamentals)))
+        results.add(ticker, score, filters, scan_date=datetime.now())
+
+    scanner = StreamScanner(frames, model, on_hit, on_idle=send_ready)
+    print(f"📡 Streaming bar updates for {len(scanner.buffers)} stocks from {source}...")
+    scanner.run(open_source(source))
+
+    send_ready(wait=True)
+    charts.shutdown()
+    results.close()
+    print(f"\n✅ Stream Complete. {scanner.bars:,} bar updates, {scanner.hits} candidates.")
+    notification.flush()
 
 
 if __name__ == "__main__":
     # Check for CLI arguments
-    # Usage: python src/main.py [TICKER] [--retrain]
+    # Usage: python src/main.py [TICKER] [--retrain] [--stream SOURCE]
+    # SOURCE is a replay file of JSON bar lines or tcp://host:port
 
     target = None
     retrain = False
+    stream_source = None
 
     args = sys.argv[1:]
     if "--retrain" in args:
         retrain = True
         args.remove("--retrain")
 
+    if "--stream" in args:
+        i = args.index("--stream")
+        if i + 1 >= len(args):
+            print("Usage: python src/main.py [TICKER] [--retrain] [--stream SOURCE]")
+            sys.exit(1)
+        stream_source = args[i + 1]
+        del args[i:i + 2]
+
     if len(args) > 0:
         target = args[0]
 
-    run_screener(target, retrain)
+    if stream_source:
+        run_stream(stream_source, retrain)
+    else:
+        run_screener(target, retrain)
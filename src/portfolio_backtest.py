@@ -0,0 +1,271 @@
+import logging
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+from config.settings import (STOCK_LIST_FILE, MODEL_PATH, MODEL_WEIGHTS_PATH, LOOKBACK_DAYS, CAPITAL_IDR, RISK_PCT,
+                             FEE_BUY, FEE_SELL, PORTFOLIO_FILE, EXIT_MODE)
+from services import market_data, technical_analysis, ai_engine
+from services.metrics import RunMetrics
+from backtest import TEST_DAYS, AI_THRESHOLD
+
+# Config
+MIN_LOTS = 3  # Same lot filter as the screener
+TRADING_DAYS_PER_YEAR = 245
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+
+def ticker_signals(df, model, threshold=AI_THRESHOLD, mode=EXIT_MODE):
+    """
+    Per-bar entry signals for one ticker, evaluated exactly like run_simulation:
+    bar i is an entry when the filters passed on bar i-1 and the LSTM scores the
+    LOOKBACK_DAYS bars before i at or above `threshold`. Every entry's exit is
+    resolved up front with resolve_exits. Returns a dict of arrays aligned to df.
+    """
+    n = len(df)
+    stages = technical_analysis.filter_series(df, window=LOOKBACK_DAYS)
+    passed = np.zeros(n, dtype=bool)
+    passed[LOOKBACK_DAYS:] = stages['passed'].to_numpy()[LOOKBACK_DAYS-1:-1]
+
+    scores = np.zeros(n)
+    candidate_days = np.flatnonzero(passed)
+    if len(candidate_days):
+        scores[candidate_days] = ai_engine.score_sliding_windows(
+            model, ai_engine.sliding_windows(df), candidate_days - LOOKBACK_DAYS)
+    entry = passed & (scores >= threshold)
+
+    sizing_price, sl, tp = technical_analysis.trade_levels(df)
+    entries = np.flatnonzero(entry)
+    exits = technical_analysis.resolve_exits(
+        entries, sl[entries], tp[entries], df['High'], df['Low'], df['Close'], df['Open'], mode=mode)
+    exit_idx = np.full(n, -1)
+    exit_price = np.full(n, np.nan)
+    win = np.zeros(n, dtype=bool)
+    exit_idx[entries] = exits['exit_idx']
+    exit_price[entries] = exits['exit_price']
+    win[entries] = exits['outcome'] == 'WIN'
+    return {'entry': entry, 'score': scores, 'sl': sl, 'sizing_price': sizing_price,
+            'exit_idx': exit_idx, 'exit_price': exit_price, 'win': win}
+
+
+def calendar_days(calendar, dates):
+    """Maps dates onto calendar columns: the first calendar day on or after each date (-1 past the end)."""
+    days = calendar.searchsorted(dates)
+    return np.where(days < len(calendar), days, -1)
+
+
+def build_panel(frames, model, metrics, days=TEST_DAYS + LOOKBACK_DAYS):
+    """Aligns every ticker's last `days` bars, entry signals and resolved exits on one calendar as (tickers, days) arrays."""
+    windows = {t: df.iloc[-days:] for t, df in frames.items() if df is not None and len(df) > LOOKBACK_DAYS}
+    tickers = sorted(windows)
+    calendar = pd.DatetimeIndex(sorted(set().union(*(df.index for df in windows.values()))))[-days:] \
+        if windows else pd.DatetimeIndex([])
+
+    shape = (len(tickers), len(calendar))
+    panel = {name: np.full(shape, np.nan) for name in ('close', 'score', 'sl', 'sizing_price', 'exit_price')}
+    panel['entry'] = np.zeros(shape, dtype=bool)
+    panel['win'] = np.zeros(shape, dtype=bool)
+    panel['exit_day'] = np.full(shape, -1)
+
+    for row, ticker in enumerate(tickers):
+        df = windows[ticker]
+        with metrics.span("signals", ticker):
+            signals = ticker_signals(df, model)
+        cols = calendar.get_indexer(df.index)
+        keep = cols >= 0
+        panel['close'][row, cols[keep]] = df['Close'].to_numpy(dtype=np.float64)[keep]
+        for name in ('entry', 'score', 'sl', 'sizing_price', 'exit_price', 'win'):
+            panel[name][row, cols[keep]] = signals[name][keep]
+        # Exit bars as calendar days by date (-1: still open at the end)
+        exit_idx = signals['exit_idx'][keep]
+        resolved = exit_idx >= 0
+        exit_day = np.full(len(exit_idx), -1)
+        exit_day[resolved] = calendar_days(calendar, df.index[exit_idx[resolved]])
+        panel['exit_day'][row, cols[keep]] = exit_day
+        metrics.ticker_done()
+
+    panel['tickers'] = tickers
+    panel['calendar'] = calendar
+    return panel
+
+
+def simulate(panel, capital=CAPITAL_IDR, risk_pct=RISK_PCT, fee_buy=FEE_BUY, fee_sell=FEE_SELL):
+    """
+    Walks the calendar once with shared capital. Each day, positions whose
+    resolved exit falls on that day are closed, then the day's signals are
+    ranked by LSTM score and filled while cash lasts. Lots come from
+    position_lots with RISK_PCT of current equity; fees are charged per side.
+    """
+    close = panel['close']
+    n, days = close.shape
+    start = min(LOOKBACK_DAYS, days)
+
+    # Open-position state, one slot per ticker
+    shares = np.zeros(n, dtype=np.int64)
+    cost_basis = np.zeros(n)
+    exit_day = np.full(n, -1)
+    exit_price = np.zeros(n)
+    win = np.zeros(n, dtype=bool)
+    entry_day = np.zeros(n, dtype=np.int64)
+    last_close = np.full(n, np.nan)
+
+    cash = float(capital)
+    equity = float(capital)
+    curve = {k: np.zeros(days - start) for k in ('equity', 'cash', 'exposure', 'traded', 'positions')}
+    trades = []
+
+    for d in range(start, days):
+        price = close[:, d]
+        has_bar = ~np.isnan(price)
+        last_close = np.where(has_bar, price, last_close)
+        held = shares > 0
+        traded = 0.0
+
+        # 1. Exits resolved at entry (resolve_exits, EXIT_MODE)
+        exits = np.flatnonzero(held & (exit_day == d))
+        if len(exits):
+            gross = shares[exits] * exit_price[exits]
+            proceeds = gross * (1 - fee_sell)
+            cash += proceeds.sum()
+            traded += gross.sum()
+            trades.append(pd.DataFrame({
+                'ticker': np.array(panel['tickers'])[exits],
+                'entry_date': panel['calendar'][entry_day[exits]],
+                'exit_date': panel['calendar'][d],
+                'shares': shares[exits],
+                'pnl': proceeds - cost_basis[exits],
+                'return_pct': (proceeds / cost_basis[exits] - 1) * 100,
+                'holding_days': d - entry_day[exits],
+                'result': np.where(win[exits], 'WIN', 'LOSS'),
+            }))
+            shares[exits] = 0
+
+        # 2. Entries: best scores first, sized off equity, filled while cash lasts
+        candidates = np.flatnonzero(panel['entry'][:, d] & ~held & has_bar)
+        if len(candidates):
+            candidates = candidates[np.argsort(-panel['score'][candidates, d], kind='stable')]
+            lots = technical_analysis.position_lots(
+                panel['sizing_price'][candidates, d], panel['sl'][candidates, d],
+                capital=equity, risk_pct=risk_pct)
+            sized = lots >= MIN_LOTS
+            candidates, lots = candidates[sized], lots[sized]
+            costs = lots * 100 * price[candidates] * (1 + fee_buy)
+            fills = np.cumsum(costs) <= cash
+            candidates, lots, costs = candidates[fills], lots[fills], costs[fills]
+            if len(candidates):
+                shares[candidates] = lots * 100
+                cost_basis[candidates] = costs
+                exit_day[candidates] = panel['exit_day'][candidates, d]
+                exit_price[candidates] = panel['exit_price'][candidates, d]
+                win[candidates] = panel['win'][candidates, d]
+                entry_day[candidates] = d
+                cash -= costs.sum()
+                traded += (lots * 100 * price[candidates]).sum()
+
+        # 3. Mark to market
+        position_value = float(np.nansum(shares * last_close))
+        equity = cash + position_value
+        i = d - start
+        curve['equity'][i] = equity
+        curve['cash'][i] = cash
+        curve['exposure'][i] = position_value / equity if equity > 0 else 0.0
+        curve['traded'][i] = traded
+        curve['positions'][i] = np.count_nonzero(shares)
+
+    curve = pd.DataFrame(curve, index=panel['calendar'][start:])
+    curve['drawdown'] = curve['equity'] / curve['equity'].cummax() - 1
+    trades = pd.concat(trades, ignore_index=True) if trades else pd.DataFrame(
+        columns=['ticker', 'entry_date', 'exit_date', 'shares', 'pnl', 'return_pct', 'holding_days', 'result'])
+    return curve, trades
+
+
+def summarize(curve, trades, capital=CAPITAL_IDR):
+    """Headline portfolio stats from the equity curve and closed trades."""
+    if curve.empty:
+        return {}
+    final = float(curve['equity'].iloc[-1])
+    years = len(curve) / TRADING_DAYS_PER_YEAR
+    avg_equity = float(curve['equity'].mean())
+    wins = int((trades['result'] == 'WIN').sum())
+    return {
+        'start_equity': float(capital),
+        'final_equity': final,
+        'return_pct': (final / capital - 1) * 100,
+        'cagr_pct': ((final / capital) ** (1 / years) - 1) * 100 if years > 0 and final > 0 else 0.0,
+        'max_dd_pct': float(curve['drawdown'].min() * 100),
+        'max_dd_date': curve['drawdown'].idxmin(),
+        'avg_exposure_pct': float(curve['exposure'].mean() * 100),
+        # One-sided: average of buys and sells over average equity, per year
+        'turnover_per_year': float(curve['traded'].sum() / 2 / avg_equity / years) if years > 0 else 0.0,
+        'trades': len(trades),
+        'win_rate': wins / len(trades) * 100 if len(trades) else 0.0,
+        'avg_trade_pct': float(trades['return_pct'].mean()) if len(trades) else 0.0,
+        'avg_holding_days': float(trades['holding_days'].mean()) if len(trades) else 0.0,
+        'open_positions': int(curve['positions'].iloc[-1]),
+    }
+
+
+def run_portfolio(frames, model, capital=CAPITAL_IDR):
+    """Runs the portfolio backtest over {ticker: screener frame}; returns (stats, equity curve, trades)."""
+    metrics = RunMetrics("portfolio")
+    panel = build_panel(frames, model, metrics)
+    with metrics.span("simulate"):
+        curve, trades = simulate(panel, capital=capital)
+    metrics.count("trades", "win", int((trades['result'] == 'WIN').sum()))
+    metrics.count("trades", "loss", int((trades['result'] == 'LOSS').sum()))
+    metrics.finish()
+    return summarize(curve, trades, capital), curve, trades
+
+
+def print_report(stats, curve):
+    """Prints the portfolio stats and saves the daily equity curve to PORTFOLIO_FILE."""
+    print("\n\n📊 PORTFOLIO RESULTS")
+    print("=" * 40)
+    if not stats:
+        print("No data to simulate.")
+        return
+    print(f"Equity:        Rp {stats['start_equity']:,.0f} → Rp {stats['final_equity']:,.0f}")
+    print(f"Return:        {stats['return_pct']:.1f}% (CAGR {stats['cagr_pct']:.1f}%)")
+    print(f"Max Drawdown:  {stats['max_dd_pct']:.1f}% ({stats['max_dd_date']:%Y-%m-%d})")
+    print(f"Exposure:      {stats['avg_exposure_pct']:.1f}% avg")
+    print(f"Turnover:      {stats['turnover_per_year']:.1f}x / year")
+    print(f"Trades:        {stats['trades']} closed, {stats['win_rate']:.1f}% win, "
+          f"{stats['avg_trade_pct']:.2f}% avg, {stats['avg_holding_days']:.1f} days held")
+    print(f"Open:          {stats['open_positions']} positions at the end")
+    print("=" * 40)
+
+    try:
+        curve.to_csv(PORTFOLIO_FILE, index_label='Date')
+    except Exception as e:
+        logging.error(f"Failed to save equity curve: {e}")
+
+
+def main():
+    print(f"🚀 Starting Portfolio Backtest (Threshold {AI_THRESHOLD}, Capital Rp {CAPITAL_IDR:,.0f})...")
+
+    if not (os.path.exists(MODEL_PATH) or os.path.exists(MODEL_WEIGHTS_PATH)):
+        print("Error: Model not found. Train it first using src/main.py")
+        return
+    model = ai_engine.load_model()
+
+    tickers = market_data.load_tickers(STOCK_LIST_FILE)
+    if not tickers:
+        print("Error: No tickers found.")
+        return
+
+    print(f"Loading {len(tickers)} stocks over past {TEST_DAYS} days...")
+    started = time.perf_counter()
+    frames = market_data.get_market_data_bulk(tickers, period="2y")
+    print(f"   Loaded in {time.perf_counter() - started:.1f}s")
+
+    stats, curve, _ = run_portfolio(frames, model)
+    print_report(stats, curve)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        print("Usage: python src/portfolio_backtest.py")
+        sys.exit(1)
+    main()
@@ -1,15 +1,18 @@
 import os
 import logging
 import numpy as np
-import tensorflow as tf
-from sklearn.preprocessing import MinMaxScaler
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import LSTM, Dense, Dropout, Input
-from config.settings import MODEL_PATH, LOOKBACK_DAYS
+from numpy.lib.stride_tricks import sliding_window_view
+from config.settings import MODEL_PATH, MODEL_WEIGHTS_PATH, LOOKBACK_DAYS
+from services.lstm_inference import NumpyLSTMModel
+
+# TensorFlow is imported lazily: only training and weight export need it.
 
 
 def create_lstm_model(input_shape):
     """Builds the LSTM model structure."""
+    from tensorflow.keras.models import Sequential
+    from tensorflow.keras.layers import LSTM, Dense, Dropout, Input
+
     model = Sequential([
         Input(shape=input_shape),
         # 1. Feature Extraction (Wyckoff Patterns)
@@ -116,10 +119,11 @@ def train_model():
     model = create_lstm_model(input_shape)
     model.fit(X_train, y_train, epochs=10, batch_size=32, verbose=0)
 
-    # Save model
+    # Save model (+ NumPy weights for TensorFlow-free inference)
     try:
         model.save(MODEL_PATH)
         logging.info(f"Model saved to {MODEL_PATH}")
+        export_weights(model)
     except Exception as e:
         logging.error(f"Failed to save model: {e}")
 
@@ -127,16 +131,150 @@ def train_model():
     return model
 
 
+def numpy_layers(model):
+    """A trained Keras model's LSTM/Dense layers as NumpyLSTMModel (kind, option, weights) entries."""
+    layers = []
+    for layer in model.layers:
+        kind = type(layer).__name__
+        if kind == "LSTM":
+            entry = ("lstm", "sequences" if layer.return_sequences else "last")
+        elif kind == "Dense":
+            entry = ("dense", layer.activation.__name__)
+        else:
+            continue  # Dropout / Input are no-ops at inference
+        layers.append(entry + ([w.astype(np.float32) for w in layer.get_weights()],))
+    return layers
+
+
+def export_weights(model, path=MODEL_WEIGHTS_PATH):
+    """
+    Dumps a trained Keras model's LSTM/Dense weights to a compact .npz for NumpyLSTMModel
+    (atomic replace, so a process loading the weights never reads a partial file).
+    """
+    layers = numpy_layers(model)
+    specs = [f"{kind}:{option}" for kind, option, _ in layers]
+    arrays = {f"{i}_{j}": weight for i, (_, _, weights) in enumerate(layers)
+              for j, weight in enumerate(weights)}
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:  # File object: savez would append .npz to a bare name
+            np.savez_compressed(f, layers=np.array(specs), **arrays)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    logging.info(f"Model weights exported to {path}")
+
+
+def load_keras_model():
+    """Loads the full Keras model from disk (imports TensorFlow) or returns None."""
+    if not os.path.exists(MODEL_PATH):
+        return None
+    try:
+        import tensorflow as tf
+        logging.info(f"Loading model from {MODEL_PATH}...")
+        return tf.keras.models.load_model(MODEL_PATH)
+    except Exception as e:
+        logging.error(f"Failed to load model: {e}")
+        return None
+
+
 def load_model():
-    """Loads model from disk or returns None."""
-    if os.path.exists(MODEL_PATH):
+    """Loads the inference model from disk or returns None.
+
+    Prefers the NumPy engine (no TensorFlow import). If the exported weights are
+    missing or older than the Keras model, they are re-exported first.
+    """
+    weights_fresh = os.path.exists(MODEL_WEIGHTS_PATH) and (
+        not os.path.exists(MODEL_PATH) or
+        os.path.getmtime(MODEL_WEIGHTS_PATH) >= os.path.getmtime(MODEL_PATH))
+
+    if not weights_fresh:
+        model = load_keras_model()
+        if model is None:
+            return None
         try:
-            logging.info(f"Loading model from {MODEL_PATH}...")
-            return tf.keras.models.load_model(MODEL_PATH)
+            export_weights(model)
         except Exception as e:
-            logging.error(f"Failed to load model: {e}")
-            return None
-    return None
+            logging.error(f"Failed to export weights, using Keras model: {e}")
+            return model
+
+    try:
+        logging.info(f"Loading NumPy weights from {MODEL_WEIGHTS_PATH}...")
+        return NumpyLSTMModel.load(MODEL_WEIGHTS_PATH)
+    except Exception as e:
+        logging.error(f"Failed to load model weights: {e}")
+        return None
+
+
+FEATURE_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+# Upper bound on windows per forward-pass batch (keeps activations small)
+PREDICT_BATCH_SIZE = 1024
+
+
+def _last_window(df):
+    """Returns the last LOOKBACK_DAYS rows plus the per-feature min/max of the full frame (or (N, 5) array)."""
+    if isinstance(df, np.ndarray):
+        data = df.astype(np.float64, copy=False)
+    else:
+        data = df[FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+    return data[-LOOKBACK_DAYS:], data.min(axis=0), data.max(axis=0)
+
+
+def scale_windows(windows, lows, highs):
+    """Min-max scales (N, LOOKBACK_DAYS, 5) windows with per-sample (N, 5) bounds, like MinMaxScaler."""
+    lows = lows[:, np.newaxis, :]
+    ranges = highs[:, np.newaxis, :] - lows
+    # MinMaxScaler maps constant features to 0 instead of dividing by zero
+    ranges = np.where(ranges == 0, 1.0, ranges)
+    return (windows - lows) / ranges
+
+
+def score_windows(model, X):
+    """Runs one forward pass over a stacked (N, LOOKBACK_DAYS, 5) tensor and returns N scores."""
+    if len(X) == 0:
+        return np.zeros(0)
+    prediction = model.predict(
+        X, verbose=0, batch_size=min(len(X), PREDICT_BATCH_SIZE))
+    return prediction[:, 0].astype(float)
+
+
+def score_batch(model, frames):
+    """Scores {ticker: df or (N, 5) OHLCV array} in a single predict call and returns {ticker: score}."""
+    scores = {}
+    keys, windows, lows, highs = [], [], [], []
+    for ticker, df in frames.items():
+        if df is None or len(df) < LOOKBACK_DAYS:
+            scores[ticker] = 0.0
+            continue
+        window, low, high = _last_window(df)
+        keys.append(ticker)
+        windows.append(window)
+        lows.append(low)
+        highs.append(high)
+
+    if keys:
+        X = scale_windows(np.stack(windows), np.stack(lows), np.stack(highs))
+        for ticker, score in zip(keys, score_windows(model, X)):
+            scores[ticker] = float(score)
+    return scores
+
+
+def sliding_windows(df):
+    """Zero-copy (N, LOOKBACK_DAYS, 5) strided view of every window in df; window k covers rows k..k+LOOKBACK_DAYS-1."""
+    data = df[FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+    return sliding_window_view(data, LOOKBACK_DAYS, axis=0).transpose(0, 2, 1)
+
+
+def score_sliding_windows(model, windows, indices):
+    """Scores the selected windows of a sliding_windows view in one predict call.
+
+    Each window is scaled by its own min/max, exactly like get_lstm_score on that slice.
+    """
+    selected = windows[indices]
+    X = scale_windows(selected, selected.min(axis=1), selected.max(axis=1))
+    return score_windows(model, X)
 
 
 def get_lstm_score(model, df):
@@ -144,17 +282,9 @@ def get_lstm_score(model, df):
     if len(df) < LOOKBACK_DAYS:
         return 0.0
 
-    data = df[['Open', 'High', 'Low', 'Close', 'Volume']].values
-
-    # Scale Data
-    scaler = MinMaxScaler(feature_range=(0, 1))
-    scaled_data = scaler.fit_transform(data)
-
-    # Create Sequence
-    X = []
-    X.append(scaled_data[-LOOKBACK_DAYS:])
-    X = np.array(X)
+    # Scale Data (per-feature min/max over the whole frame)
+    window, low, high = _last_window(df)
+    X = scale_windows(window[np.newaxis], low[np.newaxis], high[np.newaxis])
 
     # Predict
-    prediction = model.predict(X, verbose=0)
-    return float(prediction[0][0])
+    return float(score_windows(model, X)[0])
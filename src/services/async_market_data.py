@@ -0,0 +1,184 @@
+import asyncio
+import logging
+import time
+import aiohttp
+import pandas as pd
+from config.settings import (FETCH_CONCURRENCY, FETCH_RATE, FETCH_MIN_RATE, FETCH_MAX_RATE,
+                             FETCH_TIMEOUT, FETCH_MAX_RETRIES, YAHOO_CHART_URL, MARKET_TZ)
+
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+
+
+class ThrottledError(Exception):
+    """Raised when Yahoo answers with 429 or an empty payload."""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdaptiveRateLimiter:
+    """
+    Token bucket whose refill rate adapts to the server (AIMD):
+    halve the rate on a throttle signal, add a little back after each success.
+    """
+
+    def __init__(self, rate=FETCH_RATE, min_rate=FETCH_MIN_RATE, max_rate=FETCH_MAX_RATE, burst=None, increase=0.25):
+        self.rate = float(rate)
+        self.min_rate = float(min_rate)
+        self.max_rate = float(max_rate)
+        self.increase = increase
+        self.burst = float(burst or max(1.0, rate))
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens +
+                          (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        """Waits until a request token is available."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def on_success(self):
+        """Additive increase once requests go through again."""
+        self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_throttle(self, retry_after=None):
+        """Multiplicative decrease; honour Retry-After by pausing the whole bucket."""
+        self.rate = max(self.min_rate, self.rate / 2)
+        self.tokens = 0.0
+        if retry_after:
+            self.paused_until = max(
+                self.paused_until, time.monotonic() + retry_after)
+
+
+def _parse_chart(payload):
+    """Converts a Yahoo v8 chart payload into auto-adjusted OHLCV bars (same layout as yfinance history)."""
+    result = (payload.get('chart') or {}).get('result') or []
+    if not result or not result[0].get('timestamp'):
+        return None
+    result = result[0]
+    quote = result['indicators']['quote'][0]
+    tz = result.get('meta', {}).get('exchangeTimezoneName') or MARKET_TZ
+
+    index = pd.to_datetime(result['timestamp'], unit='s', utc=True).tz_convert(
+        tz).normalize()
+    df = pd.DataFrame({
+        'Open': quote.get('open'),
+        'High': quote.get('high'),
+        'Low': quote.get('low'),
+        'Close': quote.get('close'),
+        'Volume': quote.get('volume'),
+    }, index=index, dtype='float64')
+    df.index.name = 'Date'
+
+    # Back-adjust OHLC for splits/dividends like yfinance's auto_adjust=True
+    adjclose = result['indicators'].get('adjclose')
+    if adjclose:
+        ratio = pd.Series(adjclose[0]['adjclose'],
+                          index=index, dtype='float64') / df['Close']
+        for col in ['Open', 'High', 'Low', 'Close']:
+            df[col] = df[col] * ratio
+
+    df = df.dropna(subset=['Close'])
+    df = df[~df.index.duplicated(keep='last')]
+    if df.empty:
+        return None
+    # Halted/partial sessions have a close but no volume; count them as no trades
+    return df.fillna({'Volume': 0}).astype({'Volume': 'int64'})[PRICE_COLUMNS]
+
+
+class AsyncMarketDataClient:
+    """Concurrent Yahoo chart client with bounded concurrency, adaptive rate limiting and per-request timeouts."""
+
+    def __init__(self, base_url=YAHOO_CHART_URL, concurrency=FETCH_CONCURRENCY, limiter=None,
+                 timeout=FETCH_TIMEOUT, max_retries=FETCH_MAX_RETRIES):
+        self.base_url = base_url.rstrip('/')
+        self.concurrency = concurrency
+        self.limiter = limiter
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.max_retries = max_retries
+
+    def _params(self, period=None, start=None):
+        params = {'interval': '1d', 'events': 'div,split',
+                  'includeAdjustedClose': 'true'}
+        if start is not None:
+            params['period1'] = int(pd.Timestamp(
+                start, tz=MARKET_TZ).timestamp())
+            params['period2'] = int(time.time()) + 86400
+        else:
+            params['range'] = period or '6mo'
+        return params
+
+    async def _get(self, session, ticker, params):
+        await self.limiter.acquire()
+        async with session.get(f"{self.base_url}/{ticker}", params=params, timeout=self.timeout) as resp:
+            if resp.status == 429:
+                retry_after = resp.headers.get('Retry-After')
+                raise ThrottledError(f"429 for {ticker}", float(
+                    retry_after) if retry_after else None)
+            if resp.status == 404:
+                return None
+            resp.raise_for_status()
+            payload = await resp.json(content_type=None)
+
+        df = _parse_chart(payload)
+        if df is None and params.get('range'):
+            # A full-range request should never be empty for a listed ticker; Yahoo does this when throttling
+            raise ThrottledError(f"Empty response for {ticker}")
+        return df
+
+    async def fetch_history(self, session, semaphore, ticker, period=None, start=None):
+        """Fetches one ticker, retrying throttles/timeouts with backoff. Returns None on failure."""
+        params = self._params(period, start)
+        async with semaphore:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    df = await self._get(session, ticker, params)
+                    self.limiter.on_success()
+                    return df
+                except ThrottledError as e:
+                    self.limiter.on_throttle(e.retry_after)
+                    logging.debug(f"Throttled ({e}), rate now {self.limiter.rate:.2f}/s")
+                except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+                    logging.debug(f"Fetch error for {ticker}: {e!r}")
+                    await asyncio.sleep(min(2 ** attempt, 10))
+                except (KeyError, IndexError, TypeError, ValueError) as e:
+                    # Malformed payload: retrying won't fix it, and it must not abort the other tickers
+                    logging.error(f"Could not parse chart for {ticker}: {e!r}")
+                    return None
+            logging.error(
+                f"Giving up on {ticker} after {self.max_retries + 1} attempts")
+            return None
+
+    async def fetch_many(self, tickers, period=None, start=None):
+        """Fetches {ticker: DataFrame} for all tickers concurrently (failed/empty tickers are omitted)."""
+        if self.limiter is None:
+            self.limiter = AdaptiveRateLimiter()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+        async with aiohttp.ClientSession(connector=connector, headers={'User-Agent': USER_AGENT}) as session:
+            frames = await asyncio.gather(*[
+                self.fetch_history(session, semaphore, t, period, start) for t in tickers])
+        return {t: df for t, df in zip(tickers, frames) if df is not None}
+
+
+def fetch_histories(tickers, period=None, start=None, **client_kwargs):
+    """Synchronous entry point: {ticker: raw OHLCV} fetched through the async client."""
+    client = AsyncMarketDataClient(**client_kwargs)
+    return asyncio.run(client.fetch_many(tickers, period=period, start=start))
@@ -0,0 +1,104 @@
+import atexit
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from config.settings import CHART_WORKERS
+from services import charting
+
+# Bars shipped to a worker: the drawn window plus SMA 50 warm-up
+WYCKOFF_SLICE = charting.CHART_BARS + 50
+
+
+def _warm_worker():
+    """Draws one throwaway chart so fonts, the Agg canvas and mplfinance internals are loaded up front."""
+    # matplotlib/mplfinance and the chart styles come in with the services.charting import above
+    idx = pd.bdate_range("2024-01-01", periods=60)
+    close = np.linspace(1000, 1100, len(idx))
+    df = pd.DataFrame({'Open': close, 'High': close * 1.01, 'Low': close * 0.99,
+                       'Close': close, 'Volume': np.full(len(idx), 1_000_000),
+                       'OBV': np.arange(len(idx), dtype=float)}, index=idx)
+    try:
+        charting.render_chart(df, "WARMUP", {}, {'demand_zone': {'top': 1050, 'bottom': 1000}})
+    except Exception as e:
+        logging.warning(f"Chart worker warm-up failed: {e}")
+
+
+def _render(kind, ticker, df, args):
+    if kind == "deep_dive":
+        return charting.render_deep_dive_chart(df, ticker, *args)
+    return charting.render_chart(df, ticker, *args)
+
+
+class ChartPool:
+    """
+    Renders charts in worker processes so the scan loop never waits on matplotlib.
+
+    Jobs return Futures that resolve to PNG bytes. Workers import matplotlib/mplfinance
+    and build the chart styles once at start-up, then reuse them for every job.
+    With workers=0 charts are rendered inline and returned as already-completed Futures.
+    """
+
+    def __init__(self, workers=CHART_WORKERS):
+        self.workers = workers
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                # spawn: the parent already runs the Discord dispatcher thread
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_warm_worker)
+            return self._pool
+
+    def _submit(self, kind, ticker, df, *args):
+        if self.workers <= 0:
+            future = Future()
+            try:
+                future.set_result(_render(kind, ticker, df, args))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        return self._executor().submit(_render, kind, ticker, df, args)
+
+    def submit(self, ticker, df, trade_setup, filters=None):
+        """Queues a Wyckoff chart; only the bars the chart needs are sent to the worker."""
+        return self._submit("wyckoff", ticker, df.tail(WYCKOFF_SLICE), filters, trade_setup)
+
+    def submit_deep_dive(self, ticker, df, data):
+        """Queues an analytics deep-dive chart for an already-sliced frame."""
+        return self._submit("deep_dive", ticker, df, data)
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=wait)
+                self._pool = None
+
+
+def chart_bytes(future, ticker, timeout=None):
+    """Returns a finished job's PNG bytes, or None (logged) if rendering failed."""
+    try:
+        return future.result(timeout=timeout)
+    except Exception as e:
+        logging.error(f"Chart rendering failed for {ticker}: {e}")
+        return None
+
+
+_chart_pool = None
+_chart_pool_lock = threading.Lock()
+
+
+def get_chart_pool():
+    """Returns the process-wide chart pool; workers start on the first submitted job."""
+    global _chart_pool
+    with _chart_pool_lock:
+        if _chart_pool is None:
+            _chart_pool = ChartPool()
+            atexit.register(_chart_pool.shutdown)
+        return _chart_pool
@@ -1,54 +1,61 @@
+import io
 import uuid
-import os
-import matplotlib.pyplot as plt
-import mplfinance as mpf
 import matplotlib
 matplotlib.use('Agg')  # Force non-interactive backend
+import matplotlib.pyplot as plt  # noqa: E402
+import mplfinance as mpf  # noqa: E402
 
+# Bars actually drawn; indicators are computed on the full history first
+CHART_BARS = 90
 
-def generate_chart(df, ticker, filters, trade_setup):
-    """Generates a Wyckoff-style chart matching the user's aesthetic."""
-    temp_filename = f"chart_{ticker}_{uuid.uuid4().hex[:6]}.png"
+# 1. Theme Configuration (built once per process)
+# Up Candle: White, Down Candle: DodgerBlue (Cool Contrast)
+MARKET_COLORS = mpf.make_marketcolors(
+    up='#ffffff', down='#0091ea',
+    edge='inherit',
+    wick='inherit',
+    volume={'up': '#4caf50', 'down': '#ef5350'}
+)
+STYLE = mpf.make_mpf_style(
+    marketcolors=MARKET_COLORS,
+    base_mpf_style='nightclouds',
+    facecolor='#000000',      # Pure Black Background
+    edgecolor='#444444',      # Subtle grey borders
+    gridcolor='#444444',      # Subtle grid
+    gridstyle=':',            # Dotted grid
+    rc={'axes.labelsize': 10, 'xtick.labelsize': 8, 'ytick.labelsize': 8}
+)
 
-    # 1. Theme Configuration
-    # Up Candle: White, Down Candle: DodgerBlue (Cool Contrast)
-    mc = mpf.make_marketcolors(
-        up='#ffffff', down='#0091ea',
-        edge='inherit',
-        wick='inherit',
-        volume={'up': '#4caf50', 'down': '#ef5350'}
-    )
-    s = mpf.make_mpf_style(
-        marketcolors=mc,
-        base_mpf_style='nightclouds',
-        facecolor='#000000',      # Pure Black Background
-        edgecolor='#444444',      # Subtle grey borders
-        gridcolor='#444444',      # Subtle grid
-        gridstyle=':',            # Dotted grid
-        rc={'axes.labelsize': 10, 'xtick.labelsize': 8, 'ytick.labelsize': 8}
-    )
+# Deep-dive (analytics.py) theme
+DEEP_DIVE_STYLE = mpf.make_mpf_style(
+    base_mpf_style='nightclouds',
+    marketcolors=mpf.make_marketcolors(up='#2ebd85', down='#f6465d', inherit=True))
+
+
+def render_chart(df, ticker, filters, trade_setup, bars=CHART_BARS):
+    """Draws the Wyckoff-style chart once, straight into PNG bytes (no disk I/O)."""
+    # SMA 50 needs history before the visible window; don't mutate the caller's frame
+    sma50 = df['SMA50'] if 'SMA50' in df.columns else df['Close'].rolling(
+        window=50).mean()
+    view = df.tail(bars)
 
     # 2. Add Plots (Indicators & Overlays)
     apds = []
 
     # SMA 50 (Yellow Line)
-    # Check if SMA50 is already calculated, otherwise calculate it
-    if 'SMA50' not in df.columns:
-        df['SMA50'] = df['Close'].rolling(window=50).mean()
-
     apds.append(mpf.make_addplot(
-        df['SMA50'], color='#ffff00', width=1.5, label='SMA 50'))
+        sma50.tail(bars), color='#ffff00', width=1.5, label='SMA 50'))
 
     # OBV (Panel 2 - Bright Green)
-    if 'OBV' in df.columns:
+    if 'OBV' in view.columns:
         apds.append(mpf.make_addplot(
-            df['OBV'], panel=2, color='#00ff00', width=1.5, ylabel='OBV'))
+            view['OBV'], panel=2, color='#00ff00', width=1.5, ylabel='OBV'))
 
     # 3. Create Figure
     fig, axes = mpf.plot(
-        df,
+        view,
         type='candle',
-        style=s,
+        style=STYLE,
         volume=True,
         title=f"\nWyckoff Accumulation: {ticker}",
         addplot=apds,
@@ -56,8 +63,7 @@ def generate_chart(df, ticker, filters, trade_setup):
         panel_ratios=(5, 1, 1.5),  # Bigger Price Panel
         tight_layout=True,
         scale_width_adjustment=dict(volume=0.6, candle=1.2),  # Fatter candles
-        returnfig=True,
-        savefig=dict(fname=temp_filename, dpi=100, bbox_inches='tight')
+        returnfig=True
     )
 
     # 4. Custom Annotations (Support / Resistance Lines & Labels)
@@ -83,8 +89,35 @@ def generate_chart(df, ticker, filters, trade_setup):
     ax_main.text(0, support_price * 1.01, f"Support: {support_price:,.0f}",
                  color='green', fontsize=9, va='bottom', ha='left', transform=ax_main.get_yaxis_transform())
 
-    # Save manually since returnfig=True prevents auto-save
-    fig.savefig(temp_filename, dpi=100, bbox_inches='tight', facecolor='black')
+    # Single render into memory (returnfig=True prevents mpf's own save)
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', dpi=100,
+                bbox_inches='tight', facecolor='black')
     plt.close(fig)
 
+    return buf.getvalue()
+
+
+def render_deep_dive_chart(df, ticker, data):
+    """Draws the analytics deep-dive chart (Stoch RSI, SMA 200, trade levels) into PNG bytes."""
+    ap_stoch = mpf.make_addplot(
+        df['STOCHRSIk_14_14_3_3'], panel=1, color='cyan', ylabel='Stoch')
+    ap_sma = mpf.make_addplot(df['SMA_200'], color='gold', width=1.5)
+    fib = data['fib']
+    hlines = [data['entry'], data['tp'], data['sl'], fib['0.618']]
+    colors = ['white', 'green', 'red', 'lime']
+    buf = io.BytesIO()
+    mpf.plot(df, type='candle', style=DEEP_DIVE_STYLE, title=f"{ticker} - Analysis", ylabel='IDR',
+             addplot=[ap_stoch, ap_sma],
+             hlines=dict(hlines=hlines, colors=colors,
+                         linewidths=[1]*4, linestyle='dashed'),
+             volume=False, savefig=dict(fname=buf, format='png', dpi=100, pad_inches=0.25))
+    return buf.getvalue()
+
+
+def generate_chart(df, ticker, filters, trade_setup):
+    """Writes render_chart output to a temp PNG in the CWD and returns its path (file-based callers)."""
+    temp_filename = f"chart_{ticker}_{uuid.uuid4().hex[:6]}.png"
+    with open(temp_filename, "wb") as f:
+        f.write(render_chart(df, ticker, filters, trade_setup))
     return temp_filename
@@ -0,0 +1,139 @@
+import atexit
+import json
+import logging
+import queue
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from config.settings import (DISCORD_WEBHOOK_URL, DISCORD_QUEUE_SIZE, DISCORD_MAX_RETRIES, DISCORD_TIMEOUT,
+                             DISCORD_EXIT_TIMEOUT)
+
+
+class DiscordDispatcher:
+    """
+    Background Discord webhook sender.
+
+    Alerts are queued (bounded, so a stalled webhook applies back-pressure instead of
+    growing memory) and posted by one worker thread over a pooled requests.Session.
+    Discord rate limits are honoured: 429 responses are retried after retry_after /
+    Retry-After, and an exhausted bucket (X-RateLimit-Remaining: 0) pauses the worker
+    for X-RateLimit-Reset-After before the next post.
+    """
+
+    def __init__(self, webhook_url=DISCORD_WEBHOOK_URL, max_queue=DISCORD_QUEUE_SIZE,
+                 max_retries=DISCORD_MAX_RETRIES, timeout=DISCORD_TIMEOUT):
+        self.webhook_url = webhook_url
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self._resume_at = 0.0
+        self._thread = threading.Thread(
+            target=self._run, name="discord-dispatcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, payload, file_bytes=None, filename="chart.png", url=None):
+        """Queues one webhook post (blocks while the queue is full)."""
+        self.queue.put({
+            "url": url or self.webhook_url,
+            "payload": payload,
+            "file": file_bytes,
+            "filename": filename,
+        })
+
+    def flush(self, timeout=None):
+        """Waits until every queued alert has been sent (or given up on)."""
+        if timeout is None:
+            self.queue.join()
+            return True
+        deadline = time.monotonic() + timeout
+        while self.queue.unfinished_tasks:
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def flush_at_exit(self, timeout=DISCORD_EXIT_TIMEOUT):
+        """Bounded exit-time flush, so a down or rate-limiting webhook can't hang shutdown."""
+        if not self.flush(timeout):
+            logging.error(f"Discord alerts not sent within {timeout:g}s at exit; "
+                          f"dropping {self.queue.unfinished_tasks} alert(s)")
+
+    def _run(self):
+        while True:
+            job = self.queue.get()
+            try:
+                self._send(job)
+            except Exception as e:
+                logging.error(f"Failed to send Discord alert: {e}")
+            finally:
+                self.queue.task_done()
+
+    def _send(self, job):
+        if not job["url"]:
+            logging.warning("Discord Webhook URL not set. Skipping alert.")
+            return
+
+        data = {"payload_json": json.dumps(job["payload"])}
+        for attempt in range(self.max_retries + 1):
+            wait = self._resume_at - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+
+            files = None
+            if job["file"] is not None:
+                files = {"file": (job["filename"], job["file"], "image/png")}
+
+            try:
+                resp = self.session.post(
+                    job["url"], data=data, files=files, timeout=self.timeout)
+            except requests.RequestException as e:
+                logging.warning(f"Discord post failed ({e}), retrying...")
+                time.sleep(min(2 ** attempt, 30))
+                continue
+
+            self._track_bucket(resp)
+
+            if resp.status_code == 429:
+                retry_after = self._retry_after(resp)
+                logging.warning(f"Discord rate limited, retrying in {retry_after:.2f}s")
+                self._resume_at = max(self._resume_at, time.monotonic() + retry_after)
+                continue
+            if resp.status_code >= 500:
+                time.sleep(min(2 ** attempt, 30))
+                continue
+            if resp.status_code >= 400:
+                logging.error(f"Discord rejected alert ({resp.status_code}): {resp.text[:200]}")
+            return
+
+        logging.error(f"Giving up on Discord alert after {self.max_retries + 1} attempts")
+
+    def _track_bucket(self, resp):
+        """Pauses before the next post once the current rate-limit bucket is empty."""
+        if resp.headers.get("X-RateLimit-Remaining") == "0":
+            reset_after = float(resp.headers.get("X-RateLimit-Reset-After", 1))
+            self._resume_at = max(self._resume_at, time.monotonic() + reset_after)
+
+    @staticmethod
+    def _retry_after(resp):
+        try:
+            return float(resp.json().get("retry_after"))
+        except Exception:
+            return float(resp.headers.get("Retry-After", 1))
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_dispatcher():
+    """Returns the process-wide dispatcher, starting it (and its exit-time flush) on first use."""
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = DiscordDispatcher()
+            atexit.register(_dispatcher.flush_at_exit)
+        return _dispatcher
@@ -0,0 +1,196 @@
+import logging
+import os
+import threading
+from typing import Callable, NamedTuple
+import numpy as np
+import pandas as pd
+from config.settings import FEATURE_STORE_DIR, USE_FEATURE_STORE, USE_PRICE_STORE, LEAN_FRAMES
+from services import price_store
+
+
+def _ta(method, **kwargs):
+    """Wraps a pandas_ta DataFrame method so it returns only the columns it adds."""
+    def compute(df):
+        import pandas_ta  # noqa: F401  (registers the .ta accessor; only needed for these specs)
+        return getattr(df.ta, method)(**kwargs)
+    return compute
+
+
+def _obv(df):
+    # Same definition as prepare_market_data has always used (starts at 0, integer volume)
+    close = df['Close']
+    return (
+        (close > close.shift(1)).astype(int) * df['Volume'] +
+        (close < close.shift(1)).astype(int) * -df['Volume']
+    ).cumsum().rename('OBV')
+
+
+class FeatureSpec(NamedTuple):
+    compute: Callable  # OHLCV frame -> Series / DataFrame of indicator columns
+    cumulative: bool = False  # Running totals are re-based to 0 at the window start
+
+
+# Indicator specs shared by the screener, deep-dive scanner and market brief
+SPECS = {
+    'SMA20': FeatureSpec(lambda df: df['Close'].rolling(window=20).mean().rename('SMA20')),
+    'OBV': FeatureSpec(_obv, cumulative=True),
+    'VOL_SMA_20': FeatureSpec(lambda df: df['Volume'].rolling(window=20).mean().rename('VOL_SMA_20')),
+    'SMA_200': FeatureSpec(_ta('sma', length=200)),
+    'EMA_50': FeatureSpec(_ta('ema', length=50)),
+    'RSI_14': FeatureSpec(_ta('rsi', length=14)),
+    'BBANDS_20_2': FeatureSpec(_ta('bbands', length=20, std=2)),
+    'STOCHRSI_14_14_3_3': FeatureSpec(_ta('stochrsi', length=14, rsi_length=14, k=3, d=3)),
+    'ADX_14': FeatureSpec(_ta('adx', length=14)),
+    'MACD_12_26_9': FeatureSpec(_ta('macd', fast=12, slow=26, signal=9)),
+}
+
+
+class _Entry:
+    """One ticker's computed columns over its base history, valid for a single as-of bar."""
+
+    def __init__(self, base, columns=None, specs=None, stored=True):
+        self.base = base
+        self.stored = stored  # False when built from a caller's window (memoized only)
+        self.columns = columns if columns is not None else pd.DataFrame(index=base.index)
+        self.specs = dict(specs or {})  # spec -> list of its columns
+        self.lock = threading.Lock()
+
+    def warmup(self, col):
+        """Leading NaN bars of a column, i.e. how many bars the indicator needs before its first value."""
+        first_valid = self.columns[col].first_valid_index()
+        return len(self.base) if first_valid is None else self.base.index.get_loc(first_valid)
+
+    def covers(self, history):
+        """True if this entry was built from bars identical to `history` at its start and as-of bar."""
+        first, last = history.index[0], history.index[-1]
+        if last != self.base.index[-1] or first not in self.base.index:
+            return False
+        if len(self.base) - self.base.index.get_loc(first) != len(history):
+            return False
+        # A revised partial bar or a back-adjustment invalidates everything
+        return (self.base.at[last, 'Close'] == history['Close'].iat[-1] and
+                self.base.at[first, 'Close'] == history['Close'].iat[0])
+
+
+_memo = {}
+_lock = threading.Lock()
+
+
+def store_path(ticker):
+    """Returns the Parquet path holding a ticker's computed feature columns."""
+    return os.path.join(FEATURE_STORE_DIR, f"{ticker}.parquet")
+
+
+def _load(ticker, base):
+    """Loads persisted columns if they were computed for exactly this base history."""
+    path = store_path(ticker)
+    if not os.path.exists(path):
+        return _Entry(base)
+    try:
+        stored = pd.read_parquet(path)
+        if not stored.index.equals(base.index) or not stored['_close'].equals(base['Close']):
+            return _Entry(base)  # New bars or adjusted prices since it was written
+        specs = {}
+        for col in stored.columns.drop('_close'):
+            specs.setdefault(col.split('|')[0], []).append(col.split('|')[1])
+        columns = stored.drop(columns='_close')
+        columns.columns = [c.split('|')[1] for c in columns.columns]
+        return _Entry(base, columns, specs)
+    except Exception as e:
+        logging.error(f"Corrupt feature store for {ticker}, recomputing: {e}")
+        return _Entry(base)
+
+
+def _save(ticker, entry):
+    """Writes every computed column (tagged with its spec) plus the closes they were computed from."""
+    os.makedirs(FEATURE_STORE_DIR, exist_ok=True)
+    frame = pd.DataFrame({'_close': entry.base['Close']})
+    for spec, cols in entry.specs.items():
+        for col in cols:
+            frame[f"{spec}|{col}"] = entry.columns[col]
+    path = store_path(ticker)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        frame.to_parquet(tmp_path)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        logging.error(f"Failed to write feature store for {ticker}: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _base_history(ticker, history):
+    """The ticker's full stored history when it extends `history` up to the same bar, else `history` itself."""
+    if USE_PRICE_STORE:
+        stored = price_store.load(ticker)
+        if stored is not None and not stored.empty:
+            if (stored.index.tz is None) != (history.index.tz is None):
+                stored = stored.copy()
+                stored.index = (stored.index.tz_localize(None) if history.index.tz is None
+                                else stored.index.tz_localize(history.index.tz))
+            if stored.index[-1] == history.index[-1] and history.index[0] in stored.index:
+                return stored
+    return history
+
+
+def _entry(ticker, history):
+    with _lock:
+        entry = _memo.get(ticker)
+    if entry is not None and entry.covers(history):
+        return entry
+
+    base = _base_history(ticker, history)
+    entry = _load(ticker, base) if USE_FEATURE_STORE else _Entry(base)
+    if base is history or not entry.covers(history):
+        entry = _Entry(history, stored=False)
+    with _lock:
+        _memo[ticker] = entry
+    return entry
+
+
+def get_features(ticker, history, specs):
+    """
+    Returns `history` (a window of the ticker's bars) with the requested indicator columns.
+
+    Each (ticker, as-of bar, spec) is computed once over the ticker's base history
+    (the local price store when it covers the window), memoized and persisted; the
+    entry is dropped as soon as a new or revised bar shows up. Columns are re-aligned
+    to the window: warm-up bars are NaN and cumulative series start at 0, as if the
+    indicator had been computed on the window alone (recursive ones such as EMA/RSI
+    keep the longer warm-up of the base, which only moves them closer to converged).
+    With LEAN_FRAMES, prices and non-cumulative indicator columns are returned as float32.
+    """
+    entry = _entry(ticker, history)
+
+    with entry.lock:
+        missing = [s for s in specs if s not in entry.specs]
+        for spec in missing:
+            values = SPECS[spec].compute(entry.base[['Open', 'High', 'Low', 'Close', 'Volume']])
+            if values is None:
+                # pandas_ta returns nothing when there are too few bars; callers see no column
+                entry.specs[spec] = []
+                continue
+            values = values.to_frame() if isinstance(values, pd.Series) else values
+            entry.columns = entry.columns.drop(columns=values.columns, errors='ignore').join(values)
+            entry.specs[spec] = list(values.columns)
+        if missing and USE_FEATURE_STORE and entry.stored:
+            _save(ticker, entry)
+
+    if LEAN_FRAMES:
+        df = history.astype({c: np.float32 for c in history.columns if history[c].dtype.kind == 'f'})
+    else:
+        df = history.copy()
+    start = entry.base.index.get_loc(history.index[0])
+    for spec in specs:
+        for col in entry.specs[spec]:
+            values = entry.columns[col].iloc[start:].to_numpy(copy=True)
+            if start:
+                if SPECS[spec].cumulative:
+                    values = values - values[0]
+                warmup = entry.warmup(col)
+                if warmup:
+                    values[:warmup] = float('nan')
+            if LEAN_FRAMES and not SPECS[spec].cumulative:
+                values = values.astype(np.float32)
+            df[col] = values
+    return df
@@ -0,0 +1,109 @@
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from config.settings import FUNDAMENTALS_FILE, FUNDAMENTALS_TTL_HOURS, FUNDAMENTALS_WORKERS
+
+
+class FundamentalsCache:
+    """
+    Per-ticker fundamentals with a TTL, kept in memory and persisted to one JSON file.
+
+    Hits are a dict lookup. A stale entry is still returned immediately while a
+    background thread refetches it; only tickers never seen before block on Yahoo.
+    """
+
+    def __init__(self, fetch, path=FUNDAMENTALS_FILE, ttl_hours=FUNDAMENTALS_TTL_HOURS,
+                 workers=FUNDAMENTALS_WORKERS):
+        self.fetch = fetch
+        self.path = path
+        self.ttl = ttl_hours * 3600
+        self.workers = workers
+        self._entries = None
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _load(self):
+        if self._entries is not None:
+            return
+        entries = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path) as f:
+                    entries = json.load(f)
+            except Exception as e:
+                logging.error(f"Corrupt fundamentals cache, ignoring: {e}")
+        self._entries = entries
+
+    def _save(self):
+        """Writes the cache file (atomic replace). Caller holds the lock."""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(self._entries, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logging.error(f"Failed to write fundamentals cache: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _is_fresh(self, entry):
+        return time.time() - entry["fetched_at"] < self.ttl
+
+    def _fetch_one(self, ticker):
+        """Fetches one ticker and stores it; returns the data or None on failure."""
+        data = self.fetch(ticker)
+        if data is not None:
+            with self._lock:
+                self._entries[ticker] = {"fetched_at": time.time(), "data": data}
+        return data
+
+    def _refresh(self, ticker):
+        try:
+            if self._fetch_one(ticker) is not None:
+                with self._lock:
+                    self._save()
+        finally:
+            with self._lock:
+                self._refreshing.discard(ticker)
+
+    def _pool(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="fundamentals")
+        return self._executor
+
+    def get(self, ticker):
+        """Returns cached fundamentals (refreshing stale ones in the background), or None if unavailable."""
+        with self._lock:
+            self._load()
+            entry = self._entries.get(ticker)
+            if entry is not None:
+                if not self._is_fresh(entry) and ticker not in self._refreshing:
+                    self._refreshing.add(ticker)
+                    self._pool().submit(self._refresh, ticker)
+                return entry["data"]
+
+        data = self._fetch_one(ticker)
+        if data is not None:
+            with self._lock:
+                self._save()
+        return data
+
+    def prefetch(self, tickers):
+        """Fetches every missing or stale ticker concurrently and waits for them; returns the number fetched."""
+        with self._lock:
+            self._load()
+            todo = [t for t in dict.fromkeys(tickers)
+                    if t not in self._entries or not self._is_fresh(self._entries[t])]
+        if not todo:
+            return 0
+
+        fetched = sum(data is not None for data in self._pool().map(self._fetch_one, todo))
+        with self._lock:
+            self._save()
+        return fetched
@@ -0,0 +1,371 @@
+import copy
+import json
+import logging
+import math
+import os
+import sys
+import pandas as pd
+from config.settings import INDICATOR_STATE_DIR
+
+# Incremental versions of the pandas_ta indicators used by the deep-dive scanner,
+# following the pinned pandas-ta 0.4.71b0 (the version feature_store charts with). Each indicator keeps only the state its formula needs (EWM weights,
+# Wilder averages, short rolling windows), so a new bar costs O(1) regardless of
+# how much history came before it. Column names match pandas_ta's.
+
+STATE_VERSION = 2
+NAN = float('nan')
+EPSILON = sys.float_info.epsilon  # pandas_ta's zero() / non_zero_range() threshold
+
+
+def _div(a, b):
+    """Float division with pandas semantics (x/0 -> +-inf, 0/0 -> NaN)."""
+    if b == 0:
+        if a == 0 or math.isnan(a):
+            return NAN
+        return math.copysign(math.inf, a)
+    return a / b
+
+
+class _Indicator:
+    """Base class: state is plain attributes (floats, lists, nested indicators) so it round-trips through JSON."""
+
+    def state(self):
+        return {k: v.state() if isinstance(v, _Indicator) else v for k, v in vars(self).items()}
+
+    def restore(self, data):
+        for k, v in data.items():
+            current = getattr(self, k, None)
+            if isinstance(current, _Indicator):
+                current.restore(v)
+            else:
+                setattr(self, k, v)
+
+
+class _Ewm(_Indicator):
+    """Series.ewm(alpha, adjust, min_periods).mean(), one value at a time (same recursion as pandas)."""
+
+    def __init__(self, alpha, adjust=True, min_periods=0):
+        self.alpha = alpha
+        self.adjust = adjust
+        self.min_periods = min_periods
+        self.weighted = NAN
+        self.old_wt = 1.0
+        self.nobs = 0
+
+    def update(self, x):
+        is_obs = not math.isnan(x)
+        self.nobs += is_obs
+        if not math.isnan(self.weighted):
+            self.old_wt *= 1.0 - self.alpha
+            if is_obs:
+                new_wt = 1.0 if self.adjust else self.alpha
+                if self.weighted != x:
+                    self.weighted = (self.old_wt * self.weighted +
+                                     new_wt * x) / (self.old_wt + new_wt)
+                self.old_wt = self.old_wt + new_wt if self.adjust else 1.0
+        elif is_obs:
+            self.weighted = x
+        return self.weighted if self.nobs >= max(self.min_periods, 1) else NAN
+
+
+def _rma(length):
+    """pandas_ta rma: Wilder's average, ewm(alpha=1/length, adjust=False) from the first value."""
+    return _Ewm(1.0 / length, adjust=False)
+
+
+class _Window(_Indicator):
+    """The last `length` inputs."""
+
+    def __init__(self, length):
+        self.length = length
+        self.values = []
+
+    def update(self, x):
+        self.values.append(x)
+        if len(self.values) > self.length:
+            del self.values[0]
+
+    @property
+    def full(self):
+        return len(self.values) == self.length
+
+
+class _Sma(_Window):
+    """rolling(length).mean(): NaN until the window is full (or while it holds a NaN)."""
+
+    def update(self, x):
+        super().update(x)
+        return sum(self.values) / self.length if self.full else NAN
+
+
+class _Ema(_Indicator):
+    """
+    pandas_ta ema (presma): first value is the SMA of the first `length` inputs, then
+    ewm(alpha, adjust=False). alpha defaults to the span form 2 / (length + 1).
+    """
+
+    def __init__(self, length, alpha=None):
+        self.length = length
+        self.seed = []
+        self.ewm = _Ewm(alpha if alpha is not None else 2.0 / (length + 1), adjust=False)
+
+    def update(self, x):
+        if len(self.seed) < self.length:
+            self.seed.append(x)
+            if len(self.seed) < self.length:
+                return NAN
+            valid = [v for v in self.seed if not math.isnan(v)]
+            x = sum(valid) / len(valid) if valid else NAN
+        return self.ewm.update(x)
+
+
+class _Rsi(_Indicator):
+    """pandas_ta rsi: Wilder averages of gains and losses."""
+
+    def __init__(self, length):
+        self.gain = _rma(length)
+        self.loss = _rma(length)
+        self.prev = NAN
+
+    def update(self, close):
+        change = close - self.prev  # NaN on the first bar, like close.diff()
+        self.prev = close
+        gain = self.gain.update(max(change, 0.0) if not math.isnan(change) else NAN)
+        loss = self.loss.update(abs(min(change, 0.0)) if not math.isnan(change) else NAN)
+        return _div(100 * gain, gain + loss)
+
+
+class _StochRsi(_Indicator):
+    """pandas_ta stochrsi on an RSI stream: %K = SMA(k) of the stochastic, %D = SMA(d) of %K."""
+
+    def __init__(self, length, k, d):
+        self.rsi = _Window(length)
+        self.k = _Sma(k)
+        self.d = _Sma(d)
+
+    def update(self, rsi):
+        self.rsi.update(rsi)
+        if self.rsi.full:
+            low, high = min(self.rsi.values), max(self.rsi.values)
+            if any(math.isnan(v) for v in self.rsi.values):
+                low = high = NAN
+            # non_zero_range: a flat window divides by epsilon, giving 0 rather than NaN
+            stoch = _div(100 * (rsi - low), high - low) if high != low else 0.0
+        else:
+            stoch = NAN
+        k = self.k.update(stoch)
+        return k, self.d.update(k)
+
+
+class _Adx(_Indicator):
+    """
+    pandas_ta adx: ATR (true range seeded with its first `length`-bar SMA, then Wilder)
+    and Wilder-smoothed directional movement; returns (ADX, ADXR, DMP, DMN).
+    """
+
+    def __init__(self, length, adxr_length=2):
+        self.atr = _Ema(length, alpha=1.0 / length)
+        self.pos = _rma(length)
+        self.neg = _rma(length)
+        self.adx = _rma(length)
+        self.adxr_length = adxr_length
+        self.recent_adx = []
+        self.prev_high = NAN
+        self.prev_low = NAN
+        self.prev_close = NAN
+
+    def update(self, high, low, close):
+        if math.isnan(self.prev_close):
+            true_range = NAN
+        else:
+            true_range = max(abs(high - low), abs(high - self.prev_close),
+                             abs(self.prev_close - low))
+        up = high - self.prev_high
+        dn = self.prev_low - low
+        if math.isnan(up):
+            pos = neg = NAN  # First bar: no movement yet, the averages start on the next one
+        else:
+            pos = up if (up > dn and up > 0) else 0.0
+            neg = dn if (dn > up and dn > 0) else 0.0
+            pos = 0.0 if pos < EPSILON else pos
+            neg = 0.0 if neg < EPSILON else neg
+        self.prev_high, self.prev_low, self.prev_close = high, low, close
+
+        k = _div(100.0, self.atr.update(true_range))
+        dmp = k * self.pos.update(pos)
+        dmn = k * self.neg.update(neg)
+        dx = _div(100 * abs(dmp - dmn), dmp + dmn)
+        adx = self.adx.update(dx)
+        self.recent_adx = (self.recent_adx + [adx])[-(self.adxr_length + 1):]
+        adxr = 0.5 * (adx + self.recent_adx[0]) if len(self.recent_adx) > self.adxr_length else NAN
+        return adx, adxr, dmp, dmn
+
+
+class _Macd(_Indicator):
+    """pandas_ta macd: EMA(fast) - EMA(slow), signal EMA seeded from the first valid MACD value."""
+
+    def __init__(self, fast, slow, signal):
+        self.fast = _Ema(fast)
+        self.slow = _Ema(slow)
+        self.signal = _Ema(signal)
+
+    def update(self, close):
+        macd = self.fast.update(close) - self.slow.update(close)
+        if math.isnan(macd):
+            return NAN, NAN, NAN
+        signal = self.signal.update(macd)
+        return macd, macd - signal, signal
+
+
+class _BBands(_Indicator):
+    """pandas_ta bbands: SMA mid with sample (ddof=1) standard deviation bands."""
+
+    def __init__(self, length, std):
+        self.window = _Window(length)
+        self.std = std
+
+    def update(self, close):
+        self.window.update(close)
+        if not self.window.full:
+            return NAN, NAN, NAN, NAN, NAN
+        values = self.window.values
+        mid = sum(values) / len(values)
+        sd = math.sqrt(sum((v - mid) ** 2 for v in values) / (len(values) - 1))
+        lower, upper = mid - self.std * sd, mid + self.std * sd
+        return (lower, mid, upper, _div(100 * (upper - lower), mid),
+                _div(close - lower, upper - lower))
+
+
+class IndicatorState(_Indicator):
+    """
+    Per-ticker indicator state for the analytics.get_data indicator set:
+    StochRSI(14,14,3,3), ADX(14), SMA 200, EMA 50, RSI 14, MACD(12,26,9),
+    BBands(20, 2) and the 20-day volume SMA.
+    """
+
+    SNAPSHOTS = 2  # strategy_deep_dive reads the last two rows
+
+    def __init__(self):
+        self.version = STATE_VERSION
+        self.last_date = None
+        self.last_close = NAN
+        self.snapshots = []
+        self.rsi = _Rsi(14)
+        self.stochrsi = _StochRsi(14, 3, 3)
+        self.adx = _Adx(14)
+        self.sma200 = _Sma(200)
+        self.ema50 = _Ema(50)
+        self.macd = _Macd(12, 26, 9)
+        self.bbands = _BBands(20, 2.0)
+        self.vol_sma = _Sma(20)
+
+    def update(self, date, high, low, close, volume):
+        """Consumes one bar and returns its indicator row."""
+        rsi = self.rsi.update(close)
+        k, d = self.stochrsi.update(rsi)
+        adx, adxr, dmp, dmn = self.adx.update(high, low, close)
+        macd, hist, signal = self.macd.update(close)
+        bbl, bbm, bbu, bbb, bbp = self.bbands.update(close)
+        row = {
+            'STOCHRSIk_14_14_3_3': k, 'STOCHRSId_14_14_3_3': d,
+            'ADX_14': adx, 'ADXR_14_2': adxr, 'DMP_14': dmp, 'DMN_14': dmn,
+            'SMA_200': self.sma200.update(close),
+            'EMA_50': self.ema50.update(close),
+            'RSI_14': rsi,
+            'MACD_12_26_9': macd, 'MACDh_12_26_9': hist, 'MACDs_12_26_9': signal,
+            'BBL_20_2.0_2.0': bbl, 'BBM_20_2.0_2.0': bbm, 'BBU_20_2.0_2.0': bbu,
+            'BBB_20_2.0_2.0': bbb, 'BBP_20_2.0_2.0': bbp,
+            'VOL_SMA_20': self.vol_sma.update(float(volume)),
+        }
+        self.last_date = pd.Timestamp(date).isoformat()
+        self.last_close = close
+        self.snapshots = (self.snapshots + [[self.last_date, row]])[-self.SNAPSHOTS:]
+        return row
+
+    def update_frame(self, df):
+        """Consumes every bar of an OHLCV frame in order."""
+        for date, high, low, close, volume in zip(df.index, df['High'].to_numpy(float),
+                                                  df['Low'].to_numpy(float),
+                                                  df['Close'].to_numpy(float), df['Volume'].to_numpy()):
+            self.update(date, high, low, close, volume)
+
+    def frame(self):
+        """The stored snapshots as a DataFrame indexed by date."""
+        return pd.DataFrame([row for _, row in self.snapshots],
+                            index=pd.DatetimeIndex([pd.Timestamp(d) for d, _ in self.snapshots]))
+
+
+def state_path(ticker):
+    """Returns the JSON state path for a ticker."""
+    return os.path.join(INDICATOR_STATE_DIR, f"{ticker}.json")
+
+
+def load(ticker):
+    """Loads a ticker's persisted state, or None if missing, corrupt or from an older layout."""
+    path = state_path(ticker)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path) as f:
+            data = json.load(f)
+        if data.get('version') != STATE_VERSION:
+            return None
+        state = IndicatorState()
+        state.restore(data)
+        return state
+    except Exception as e:
+        logging.error(f"Corrupt indicator state for {ticker}, rebuilding: {e}")
+        return None
+
+
+def save(ticker, state):
+    """Writes a ticker's state (atomic replace)."""
+    os.makedirs(INDICATOR_STATE_DIR, exist_ok=True)
+    path = state_path(ticker)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "w") as f:
+            json.dump(state.state(), f)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        logging.error(f"Failed to write indicator state for {ticker}: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _new_bars(state, history):
+    """Bars after the state's last committed bar, or None when the state can't be continued."""
+    if state is None or state.last_date is None:
+        return None
+    last = pd.Timestamp(state.last_date)
+    if last not in history.index:
+        return None
+    # Yahoo back-adjusts history on splits/dividends; a changed close means the state is stale
+    stored_close = float(history.loc[last, 'Close'])
+    if not math.isclose(stored_close, state.last_close, rel_tol=1e-6):
+        return None
+    new = history[history.index > last]
+    return new if not new.empty else None
+
+
+def latest_frame(ticker, history, bars=120):
+    """
+    Returns history.tail(bars) with the indicator columns filled in for the last two bars.
+
+    The state is advanced with new bars only and persisted up to the second-to-last
+    bar; the last bar may still be a partial session, so it is applied to a copy.
+    Without usable state (first run, adjusted prices) it is rebuilt from `history`.
+    """
+    state = load(ticker)
+    new = _new_bars(state, history)
+    if new is None:
+        state = IndicatorState()
+        new = history
+
+    if len(new) > 1:
+        state.update_frame(new.iloc[:-1])
+        save(ticker, state)
+
+    latest = copy.deepcopy(state)
+    latest.update_frame(new.iloc[-1:])
+    return history.tail(bars).join(latest.frame())
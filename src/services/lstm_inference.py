@@ -0,0 +1,85 @@
+import numpy as np
+
+# Pure-NumPy inference for the Wyckoff LSTM.
+# Importing this module does not pull in TensorFlow; weights come from the
+# .npz written by ai_engine.export_weights.
+
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+def _relu(x):
+    return np.maximum(x, 0.0)
+
+
+ACTIVATIONS = {
+    "linear": lambda x: x,
+    "relu": _relu,
+    "sigmoid": _sigmoid,
+    "tanh": np.tanh,
+}
+
+
+def _lstm(x, kernel, recurrent_kernel, bias, return_sequences):
+    """Keras LSTM forward pass (gate order i, f, c, o; sigmoid / tanh activations)."""
+    batch, steps, _ = x.shape
+    units = recurrent_kernel.shape[0]
+    h = np.zeros((batch, units), dtype=x.dtype)
+    c = np.zeros((batch, units), dtype=x.dtype)
+
+    # Input projection for every timestep in one matmul
+    x_proj = x @ kernel + bias
+    outputs = np.empty((batch, steps, units),
+                       dtype=x.dtype) if return_sequences else None
+
+    for t in range(steps):
+        z = x_proj[:, t, :] + h @ recurrent_kernel
+        i = _sigmoid(z[:, :units])
+        f = _sigmoid(z[:, units:2 * units])
+        g = np.tanh(z[:, 2 * units:3 * units])
+        o = _sigmoid(z[:, 3 * units:])
+        c = f * c + i * g
+        h = o * np.tanh(c)
+        if return_sequences:
+            outputs[:, t, :] = h
+
+    return outputs if return_sequences else h
+
+
+class NumpyLSTMModel:
+    """Inference-only stand-in for the Keras model; exposes a compatible predict()."""
+
+    def __init__(self, layers):
+        self.layers = layers
+
+    @classmethod
+    def load(cls, path):
+        """Loads an exported weights .npz."""
+        with np.load(path, allow_pickle=False) as data:
+            specs = [str(s) for s in data["layers"]]
+            layers = []
+            for idx, spec in enumerate(specs):
+                kind, option = spec.split(":")
+                weights = [data[f"{idx}_{j}"].astype(np.float32)
+                           for j in range(3 if kind == "lstm" else 2)]
+                layers.append((kind, option, weights))
+        return cls(layers)
+
+    def predict(self, X, verbose=0, batch_size=None):
+        """Forward pass over an (N, steps, features) array; returns (N, 1) scores."""
+        X = np.asarray(X, dtype=np.float32)
+        if batch_size is None or batch_size >= len(X):
+            return self._forward(X)
+        return np.concatenate([self._forward(X[i:i + batch_size])
+                               for i in range(0, len(X), batch_size)])
+
+    def _forward(self, out):
+        for kind, option, weights in self.layers:
+            if kind == "lstm":
+                out = _lstm(out, *weights,
+                            return_sequences=(option == "sequences"))
+            else:
+                kernel, bias = weights
+                out = ACTIVATIONS[option](out @ kernel + bias)
+        return out
@@ -1,13 +1,27 @@
 import logging
+import numpy as np
 import pandas as pd
 import yfinance as yf
-from config.settings import LOOKBACK_DAYS
+from config.settings import (LOOKBACK_DAYS, USE_PRICE_STORE, MARKET_TZ, BULK_CHUNK_SIZE, FETCH_BACKEND,
+                             MARKET_DATA_SOURCE, LEAN_FRAMES)
+from services import price_store, feature_store
+from services.fundamentals_cache import FundamentalsCache
 
 
-def load_tickers(file_path):
-    """Loads ticker symbols from an Excel file."""
-    try:
+def load_stock_list(file_path):
+    """Reads the stock list spreadsheet once (shared by every stage in the pipeline)."""
+    if file_path.endswith('.xlsx'):
         df = pd.read_excel(file_path)
+    else:
+        df = pd.read_csv(file_path)
+    df.columns = df.columns.str.strip()
+    return df
+
+
+def load_tickers(file_path, stock_list=None):
+    """Loads ticker symbols from an Excel file (or an already-loaded stock list)."""
+    try:
+        df = stock_list if stock_list is not None else load_stock_list(file_path)
         tickers = []
         for t in df['Code'].astype(str):
             t = t.strip().upper()
@@ -22,46 +36,315 @@ def load_tickers(file_path):
         return []
 
 
-def get_market_data(ticker, period="6mo"):
-    """Fetches historical market data including OBV."""
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+# Stored history may start a few sessions after the requested cut-off
+# (weekends, holidays); only refetch when the gap is larger than this.
+BACKFILL_GRACE = pd.Timedelta(days=7)
+
+
+def _period_start(period):
+    """Converts a yfinance period string ('6mo', '1y', '2y', 'ytd', 'max') into a cut-off timestamp."""
+    now = pd.Timestamp.now(tz=MARKET_TZ).normalize()
+    if period == "max":
+        return None
+    if period == "ytd":
+        return now.replace(month=1, day=1)
+    for unit, offset in (("mo", "months"), ("wk", "weeks"), ("d", "days"), ("y", "years")):
+        if period.endswith(unit):
+            return now - pd.DateOffset(**{offset: int(period[:-len(unit)])})
+    raise ValueError(f"Unsupported period: {period}")
+
+
+def trim_period(history, period):
+    """Trims bars to a yfinance-style period (e.g. a 2y history down to 6mo) as a new frame."""
+    if history is None:
+        return None
+    start = _period_start(period)
+    if start is None:
+        return history.copy()
+    return history.truncate(before=start)
+
+
+def _download_history(ticker, **kwargs):
+    """Downloads raw OHLCV bars from Yahoo Finance."""
+    history = yf.Ticker(ticker).history(**kwargs)
+    if history is None or history.empty:
+        return None
+    return history[PRICE_COLUMNS]
+
+
+def _download_bulk(tickers, **kwargs):
+    """Downloads raw OHLCV bars for several tickers in one multi-symbol request."""
+    data = yf.download(tickers, group_by='ticker', auto_adjust=True, ignore_tz=False,
+                       threads=True, progress=False, **kwargs)
+    frames = {}
+    if data is None or data.empty:
+        return frames
+
+    available = set(data.columns.get_level_values(0))
+    for ticker in tickers:
+        if ticker not in available:
+            continue
+        # Multi-symbol frames share one calendar; drop sessions this ticker did not trade
+        df = data[ticker][PRICE_COLUMNS].dropna(subset=['Close'])
+        if df.empty:
+            continue
+        # Halted/partial sessions come back with a close but NaN volume; count them as no trades
+        frames[ticker] = df.fillna({'Volume': 0}).astype({'Volume': 'int64'})
+    return frames
+
+
+def _needs_full_fetch(stored, start):
+    """True when the store is empty or does not reach back to the requested cut-off."""
+    if stored is None or stored.empty:
+        return True
+    return start is not None and stored.index[0] > start + BACKFILL_GRACE
+
+
+def _finalize_history(ticker, stored, fresh, start):
+    """Merges fresh bars into the store, persists them and trims to the requested period."""
+    history = price_store.merge(stored, fresh)
+    if history is None or history.empty:
+        return None
+    if fresh is not None and not fresh.empty:
+        price_store.save(ticker, history)
+
+    if start is not None:
+        history = history.truncate(before=start)
+    return history
+
+
+def read_db_histories(tickers, period="6mo"):
+    """Reads {ticker: raw OHLCV} for a period from the daily_prices table in one range query."""
+    # Imported lazily so Yahoo-only runs don't need a database configured
+    from services import price_db
+
+    return price_db.read_prices(tickers, start=_period_start(period))
+
+
+def read_tensor_histories(tickers, period="6mo"):
+    """Slices {ticker: raw OHLCV} for a period out of the memory-mapped universe panel (no download, no parsing)."""
+    from services import price_tensor
+
+    tensor = price_tensor.get_price_tensor()
+    if tensor is None:
+        return {}
+    return tensor.histories(tickers, start=_period_start(period))
+
+
+def get_history(ticker, period="6mo"):
+    """Returns raw OHLCV bars, served from the local price store and topped up with new bars only."""
     try:
-        stock = yf.Ticker(ticker)
-        # Fetch requested period
-        history = stock.history(period=period)
+        if MARKET_DATA_SOURCE == "db":
+            return read_db_histories([ticker], period).get(ticker)
+        if MARKET_DATA_SOURCE == "universe":
+            return read_tensor_histories([ticker], period).get(ticker)
+
+        if not USE_PRICE_STORE:
+            return _download_history(ticker, period=period)
+
+        stored = price_store.load(ticker)
+        start = _period_start(period)
+
+        if _needs_full_fetch(stored, start):
+            # Cold (or too short) store: fetch the full period once
+            fresh = _download_history(ticker, period=period)
+        else:
+            # Warm store: re-fetch from the last stored session so a partial bar gets finalised
+            fresh = _download_history(
+                ticker, start=stored.index[-1].strftime("%Y-%m-%d"))
+
+        return _finalize_history(ticker, stored, fresh, start)
+
+    except Exception as e:
+        logging.error(f"Error fetching history for {ticker}: {e}")
+        return None
 
-        if len(history) < LOOKBACK_DAYS:
-            return None
 
-        # Clean data
-        df = history[['Open', 'High', 'Low', 'Close', 'Volume']].copy()
+def get_history_bulk(tickers, period="6mo", chunk_size=BULK_CHUNK_SIZE, source=None):
+    """
+    Returns {ticker: raw OHLCV} for many tickers using chunked multi-symbol downloads.
+    `source` overrides MARKET_DATA_SOURCE ('yahoo', 'db' or 'universe'); jobs that
+    populate the DB or the universe panel pass 'yahoo' so they never read their own output.
+    """
+    source = source or MARKET_DATA_SOURCE
+    if source == "db":
+        return read_db_histories(tickers, period)
+    if source == "universe":
+        return read_tensor_histories(tickers, period)
 
-        # Calculate OBV (On-Balance Volume)
+    start = _period_start(period)
+    stored = {t: price_store.load(t) for t in tickers} if USE_PRICE_STORE else {}
+
+    # Group tickers by what they need so each group is one request per chunk:
+    # cold tickers get the full period, warm ones only bars since their last session.
+    groups = {}
+    for ticker in tickers:
+        existing = stored.get(ticker)
+        if _needs_full_fetch(existing, start):
+            key = ("period", period)
+        else:
+            key = ("start", existing.index[-1].strftime("%Y-%m-%d"))
+        groups.setdefault(key, []).append(ticker)
+
+    fresh = {}
+    for (kind, value), group in groups.items():
+        if FETCH_BACKEND == "async":
+            # Imported lazily so yfinance-only runs don't need aiohttp
+            from services import async_market_data
+
+            # One concurrent, rate-limited request per ticker (no chunking needed)
+            fresh.update(async_market_data.fetch_histories(
+                group, **{kind: value}))
+            continue
+        for i in range(0, len(group), chunk_size):
+            chunk = group[i:i + chunk_size]
+            try:
+                fresh.update(_download_bulk(chunk, **{kind: value}))
+            except Exception as e:
+                logging.error(
+                    f"Bulk download failed for {len(chunk)} tickers ({chunk[0]}...): {e}")
+
+    histories = {}
+    for ticker in tickers:
+        if not USE_PRICE_STORE:
+            history = fresh.get(ticker)
+        else:
+            history = _finalize_history(
+                ticker, stored.get(ticker), fresh.get(ticker), start)
+        if history is not None and not history.empty:
+            histories[ticker] = history
+    return histories
+
+
+# Derived screener columns and the warm-up bars each one drops from the front of the frame
+DERIVED_COLUMNS = {'OBV': 0, 'SMA20': 19}
+
+
+def _prepare_lean(history, columns):
+    """
+    LEAN_FRAMES variant of prepare_market_data: float32 prices, int64 volume/OBV,
+    only the requested derived columns, and a single DataFrame built at the end
+    (no full copy, no in-place dropna). Returns None when bars have gaps (NaN),
+    so the caller falls back to the pandas path for them.
+    """
+    prices = history[PRICE_COLUMNS[:4]].to_numpy(dtype=np.float32)
+    volume = history['Volume']
+    if volume.isna().any() or np.isnan(prices).any():
+        return None
+    volume = volume.to_numpy(dtype=np.int64)
+
+    derived = {}
+    if 'OBV' in columns:
+        # Direction from the full-precision closes, so OBV matches the pandas path exactly
+        close = history['Close'].to_numpy(dtype=np.float64)
+        step = np.zeros(len(close), dtype=np.int64)
+        step[1:] = np.sign(close[1:] - close[:-1]).astype(np.int64) * volume[1:]
+        derived['OBV'] = np.cumsum(step)
+    if 'SMA20' in columns:
+        derived['SMA20'] = history['Close'].rolling(window=20).mean().to_numpy(dtype=np.float32)
+
+    start = max((DERIVED_COLUMNS[c] for c in columns), default=0)
+    data = {col: prices[start:, i] for i, col in enumerate(PRICE_COLUMNS[:4])}
+    data['Volume'] = volume[start:]
+    data.update({col: values[start:] for col, values in derived.items()})
+    return pd.DataFrame(data, index=history.index[start:])
+
+
+def prepare_market_data(history, ticker=None, columns=tuple(DERIVED_COLUMNS)):
+    """
+    Derives the screener frame (OHLCV + `columns`, default OBV + SMA20) from raw bars
+    (via the feature store when ticker is given). `columns` are feature_store.SPECS names.
+    With LEAN_FRAMES, OBV/SMA20-only frames are built with float32 prices.
+    """
+    if history is None or len(history) < LOOKBACK_DAYS:
+        return None
+
+    if LEAN_FRAMES and set(columns) <= set(DERIVED_COLUMNS):
+        df = _prepare_lean(history, columns)
+        if df is not None:
+            return df
+
+    if ticker is not None:
+        df = feature_store.get_features(ticker, history[PRICE_COLUMNS], list(columns))
+        df.dropna(inplace=True)
+        return df
+
+    # Clean data
+    df = history[PRICE_COLUMNS].copy()
+
+    # Calculate OBV (On-Balance Volume)
+    if 'OBV' in columns:
         df['OBV'] = (
             (df['Close'] > df['Close'].shift(1)).astype(int) * df['Volume'] +
             (df['Close'] < df['Close'].shift(1)).astype(int) * -df['Volume']
         ).cumsum()
 
-        # Calculate SMA (20-day)
+    # Calculate SMA (20-day)
+    if 'SMA20' in columns:
         df['SMA20'] = df['Close'].rolling(window=20).mean()
 
-        df.dropna(inplace=True)
-        return df
+    # Any other requested indicators come from the shared specs
+    for column in columns:
+        if column not in DERIVED_COLUMNS:
+            values = feature_store.SPECS[column].compute(df[PRICE_COLUMNS])
+            if values is not None:
+                df = df.join(values)
+
+    df.dropna(inplace=True)
+    return df
 
+
+def get_market_data(ticker, period="6mo"):
+    """Fetches historical market data including OBV."""
+    try:
+        return prepare_market_data(get_history(ticker, period=period), ticker)
     except Exception as e:
         logging.error(f"Error fetching data for {ticker}: {e}")
         return None
 
 
-def get_fundamentals(ticker):
-    """Fetches basic fundamental data."""
+def get_market_data_bulk(tickers, period="6mo", chunk_size=BULK_CHUNK_SIZE):
+    """Bulk variant of get_market_data for universe scans: {ticker: DataFrame with OBV/SMA20}."""
+    frames = {}
+    for ticker, history in get_history_bulk(tickers, period=period, chunk_size=chunk_size).items():
+        try:
+            df = prepare_market_data(history, ticker)
+        except Exception as e:
+            logging.error(f"Error preparing data for {ticker}: {e}")
+            continue
+        if df is not None:
+            frames[ticker] = df
+    return frames
+
+
+def _download_fundamentals(ticker):
+    """Fetches basic fundamental data from Yahoo (None on failure, so failures aren't cached)."""
     try:
-        stock = yf.Ticker(ticker)
-        info = stock.info
+        info = yf.Ticker(ticker).info
         return {
             "mcap": f"{info.get('marketCap', 0)/1e9:,.0f} B",
             "per": info.get('trailingPE', 0),
             "pbv": info.get('priceToBook', 0),
             "roe": info.get('returnOnEquity', 0)
         }
-    except:
+    except Exception as e:
+        logging.error(f"Failed to fetch fundamentals for {ticker}: {e}")
+        return None
+
+
+_fundamentals = FundamentalsCache(_download_fundamentals)
+
+
+def get_fundamentals(ticker):
+    """Fetches basic fundamental data (cached for FUNDAMENTALS_TTL_HOURS)."""
+    data = _fundamentals.get(ticker)
+    if data is None:
         return {"mcap": "N/A", "per": 0, "pbv": 0, "roe": 0}
+    return data
+
+
+def prefetch_fundamentals(tickers):
+    """Warms the fundamentals cache for many tickers concurrently."""
+    return _fundamentals.prefetch(tickers)
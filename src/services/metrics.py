@@ -0,0 +1,244 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+import numpy as np
+from config.settings import METRICS_DIR
+
+# Prometheus-style latency buckets (seconds): sub-millisecond filters up to multi-minute fetches
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+           1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+PROM_PREFIX = "ihsg"
+SLOWEST_TICKERS = 10
+
+
+class Histogram:
+    """Latency samples (seconds). Kept raw so reports get exact quantiles and worker runs merge losslessly."""
+
+    def __init__(self, samples=None):
+        self.samples = list(samples or [])
+
+    def observe(self, seconds):
+        self.samples.append(seconds)
+
+    def summary(self):
+        if not self.samples:
+            return {'count': 0, 'sum_s': 0.0}
+        values = np.array(self.samples)
+        p50, p95, p99 = np.percentile(values, [50, 95, 99])
+        return {
+            'count': len(values),
+            'sum_s': float(values.sum()),
+            'mean_ms': float(values.mean() * 1000),
+            'p50_ms': float(p50 * 1000),
+            'p95_ms': float(p95 * 1000),
+            'p99_ms': float(p99 * 1000),
+            'max_ms': float(values.max() * 1000),
+        }
+
+    def buckets(self):
+        """Cumulative (le, count) pairs, ending with +Inf."""
+        values = np.sort(np.array(self.samples))
+        counts = np.searchsorted(values, BUCKETS, side='right')
+        return [(str(le), int(n)) for le, n in zip(BUCKETS, counts)] + [("+Inf", len(values))]
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{k}="{str(v)}"' for k, v in labels.items()) + "}"
+
+
+class RunMetrics:
+    """
+    Timings and counters for one run of a scanner (screener, backtest, deep dive, market brief).
+
+    `span(stage, ticker)` times a block into the stage's histogram and, with a
+    ticker, adds it to that ticker's total; `count(name, label)` bumps a counter
+    (e.g. check_filters rejections by stage). `export()` writes <run>.json and a
+    Prometheus <run>.prom textfile. Safe to use from worker threads.
+    """
+
+    def __init__(self, run):
+        self.run = run
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self.stages = {}  # stage -> Histogram
+        self.tickers = {}  # ticker -> seconds across all its spans
+        self.counters = {}  # name -> {label: count}
+        self.frame_bytes = {}  # ticker -> bytes of the largest frame it held
+        self.processed = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, stage, ticker=None):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started, ticker)
+
+    def observe(self, stage, seconds, ticker=None):
+        with self._lock:
+            self.stages.setdefault(stage, Histogram()).observe(seconds)
+            if ticker is not None:
+                self.tickers[ticker] = self.tickers.get(ticker, 0.0) + seconds
+
+    def time_future(self, stage, future, ticker=None):
+        """Records a Future's submit-to-completion time (e.g. a chart render in the worker pool)."""
+        started = time.perf_counter()
+        future.add_done_callback(lambda _: self.observe(stage, time.perf_counter() - started, ticker))
+        return future
+
+    def count(self, name, label="total", n=1):
+        with self._lock:
+            counter = self.counters.setdefault(name, {})
+            counter[label] = counter.get(label, 0) + n
+
+    def record_frame(self, ticker, df):
+        """Records a ticker's working DataFrame size (values + index), keeping its largest frame."""
+        nbytes = int(df.memory_usage(index=True).sum())
+        with self._lock:
+            self.frame_bytes[ticker] = max(nbytes, self.frame_bytes.get(ticker, 0))
+
+    def ticker_done(self, n=1):
+        """Marks tickers as fully processed (drives tickers/sec)."""
+        with self._lock:
+            self.processed += n
+
+    def snapshot(self):
+        """Picklable state, for shipping a worker process's metrics back to the parent."""
+        with self._lock:
+            return {'stages': {s: h.samples for s, h in self.stages.items()},
+                    'tickers': dict(self.tickers),
+                    'counters': {n: dict(c) for n, c in self.counters.items()},
+                    'frame_bytes': dict(self.frame_bytes),
+                    'processed': self.processed}
+
+    def merge(self, snapshot):
+        """Folds a snapshot (e.g. from a worker process) into this run."""
+        with self._lock:
+            for stage, samples in snapshot['stages'].items():
+                self.stages.setdefault(stage, Histogram()).samples.extend(samples)
+            for ticker, seconds in snapshot['tickers'].items():
+                self.tickers[ticker] = self.tickers.get(ticker, 0.0) + seconds
+            for name, counter in snapshot['counters'].items():
+                mine = self.counters.setdefault(name, {})
+                for label, n in counter.items():
+                    mine[label] = mine.get(label, 0) + n
+            for ticker, nbytes in snapshot['frame_bytes'].items():
+                self.frame_bytes[ticker] = max(nbytes, self.frame_bytes.get(ticker, 0))
+            self.processed += snapshot['processed']
+
+    def report(self):
+        """The run as a JSON-ready dict."""
+        duration = time.perf_counter() - self._started
+        with self._lock:
+            per_ticker = Histogram(self.tickers.values())
+            slowest = sorted(self.tickers.items(), key=lambda kv: kv[1], reverse=True)[:SLOWEST_TICKERS]
+            return {
+                'run': self.run,
+                'started_at': self.started_at,
+                'duration_s': duration,
+                'tickers_processed': self.processed,
+                'tickers_per_s': self.processed / duration if duration > 0 else 0.0,
+                'stages': {s: h.summary() for s, h in self.stages.items()},
+                'per_ticker': per_ticker.summary(),
+                'slowest_tickers': [{'ticker': t, 'seconds': s} for t, s in slowest],
+                'counters': {n: dict(c) for n, c in self.counters.items()},
+                'memory': self._memory(),
+            }
+
+    def _memory(self):
+        """Per-ticker frame memory (caller holds the lock)."""
+        if not self.frame_bytes:
+            return {'tickers': 0, 'total_bytes': 0}
+        values = np.array(list(self.frame_bytes.values()))
+        return {
+            'tickers': len(values),
+            'total_bytes': int(values.sum()),
+            'per_ticker_mean_bytes': float(values.mean()),
+            'per_ticker_p95_bytes': float(np.percentile(values, 95)),
+            'per_ticker_max_bytes': int(values.max()),
+        }
+
+    def prometheus(self):
+        """The run in Prometheus text exposition format."""
+        report = self.report()
+        run = self.run
+        lines = []
+
+        def histogram(name, help_text, hist):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for label_set, h in hist:
+                for le, n in h.buckets():
+                    lines.append(f"{name}_bucket{_labels(**label_set, le=le)} {n}")
+                lines.append(f"{name}_sum{_labels(**label_set)} {sum(h.samples)}")
+                lines.append(f"{name}_count{_labels(**label_set)} {len(h.samples)}")
+
+        with self._lock:
+            stages = [({'run': run, 'stage': s}, h) for s, h in sorted(self.stages.items())]
+            per_ticker = Histogram(self.tickers.values())
+            counters = {n: dict(c) for n, c in self.counters.items()}
+
+        histogram(f"{PROM_PREFIX}_stage_duration_seconds", "Time spent per stage call.", stages)
+        histogram(f"{PROM_PREFIX}_ticker_duration_seconds", "Time spent per ticker across its stages.",
+                  [({'run': run}, per_ticker)])
+
+        for name, counter in sorted(counters.items()):
+            metric = f"{PROM_PREFIX}_{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            for label, n in sorted(counter.items()):
+                lines.append(f"{metric}{_labels(run=run, kind=label)} {n}")
+
+        memory = report['memory']
+        for metric, kind, value in (
+                ("frame_bytes_total", "gauge", memory['total_bytes']),
+                ("frame_bytes_per_ticker_mean", "gauge", memory.get('per_ticker_mean_bytes', 0)),
+                ("frame_bytes_per_ticker_max", "gauge", memory.get('per_ticker_max_bytes', 0)),
+                ("tickers_processed_total", "counter", report['tickers_processed']),
+                ("tickers_per_second", "gauge", report['tickers_per_s']),
+                ("run_duration_seconds", "gauge", report['duration_s']),
+                ("run_last_completed_timestamp_seconds", "gauge", time.time())):
+            lines.append(f"# TYPE {PROM_PREFIX}_{metric} {kind}")
+            lines.append(f"{PROM_PREFIX}_{metric}{_labels(run=run)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def print_summary(self):
+        report = self.report()
+        print(f"\n⏱️ {self.run}: {report['tickers_processed']} tickers in {report['duration_s']:.1f}s "
+              f"({report['tickers_per_s']:.1f}/s)")
+        for stage, s in sorted(report['stages'].items(), key=lambda kv: -kv[1]['sum_s']):
+            print(f"   {stage:<14} {s['sum_s']:>8.2f}s total | {s['count']:>6} calls | "
+                  f"p50 {s['p50_ms']:.1f} ms | p95 {s['p95_ms']:.1f} ms")
+        for name, counter in report['counters'].items():
+            print(f"   {name}: " + ", ".join(f"{k}={v}" for k, v in counter.items()))
+        memory = report['memory']
+        if memory['tickers']:
+            print(f"   memory: {memory['per_ticker_mean_bytes'] / 1024:.1f} KB/ticker "
+                  f"(max {memory['per_ticker_max_bytes'] / 1024:.1f} KB), "
+                  f"{memory['total_bytes'] / 1024 ** 2:.1f} MB across {memory['tickers']} frames")
+
+    def export(self, directory=METRICS_DIR):
+        """Writes <run>.json and <run>.prom (atomic replace, so collectors never read a partial file)."""
+        os.makedirs(directory, exist_ok=True)
+        paths = []
+        for suffix, content in ((".json", json.dumps(self.report(), indent=2)), (".prom", self.prometheus())):
+            path = os.path.join(directory, f"{self.run}{suffix}")
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            try:
+                with open(tmp_path, "w") as f:
+                    f.write(content)
+                os.replace(tmp_path, path)
+                paths.append(path)
+            except Exception as e:
+                logging.error(f"Failed to write metrics {path}: {e}")
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+        return paths
+
+    def finish(self):
+        """Prints the stage summary and exports the run; returns the written paths."""
+        self.print_summary()
+        return self.export()
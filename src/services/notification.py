@@ -1,18 +1,34 @@
-import requests
-import json
 import logging
 import os
 from datetime import datetime
 from config.settings import DISCORD_WEBHOOK_URL
+from services.dispatcher import get_dispatcher
 
 
-def send_alert(ticker, filters, score, chart_path, trade_setup, fundamentals=None, override_status=None, failure_reason=None):
-    """Sends a rich Discord embed alert."""
+def _take_chart(ticker, chart):
+    """Returns (png_bytes, filename) for an in-memory chart or a temp chart file (which is removed)."""
+    if chart is None:
+        return None, None
+    if isinstance(chart, (bytes, bytearray)):
+        return bytes(chart), f"chart_{ticker}.png"
+    try:
+        with open(chart, "rb") as f:
+            chart_bytes = f.read()
+        os.remove(chart)
+        return chart_bytes, os.path.basename(chart)
+    except Exception as e:
+        logging.error(f"Failed to read chart for Discord alert: {e}")
+        return None, None
+
+
+def send_alert(ticker, filters, score, chart, trade_setup, fundamentals=None, override_status=None, failure_reason=None):
+    """Sends a rich Discord embed alert. `chart` is PNG bytes (render_chart) or a chart file path."""
+
+    # Read the chart now so a temp file can go; the post happens on the dispatcher thread
+    chart_bytes, chart_name = _take_chart(ticker, chart)
 
     if not DISCORD_WEBHOOK_URL:
         logging.warning("Discord Webhook URL not set. Skipping alert.")
-        if os.path.exists(chart_path):
-            os.remove(chart_path)
         return
 
     color = 5763719  # Green-ish (Default Success)
@@ -96,13 +112,8 @@ Profit/Lot : Rp {trade_setup['profit_per_lot']:,.0f}
         }]
     }
 
-    try:
-        with open(chart_path, "rb") as f:
-            requests.post(DISCORD_WEBHOOK_URL, data={
-                          "payload_json": json.dumps(embed)}, files={"file": f})
-        os.remove(chart_path)
-    except Exception as e:
-        logging.error(f"Failed to send Discord alert: {e}")
+    get_dispatcher().submit(embed, chart_bytes,
+                            filename=chart_name or "chart.png")
 
 
 def send_scan_summary(total_scanned, candidates_found):
@@ -130,8 +141,9 @@ def send_scan_summary(total_scanned, candidates_found):
         }]
     }
 
-    try:
-        requests.post(DISCORD_WEBHOOK_URL, data={
-                      "payload_json": json.dumps(embed)})
-    except Exception as e:
-        logging.error(f"Failed to send summary: {e}")
+    get_dispatcher().submit(embed)
+
+
+def flush(timeout=None):
+    """Blocks until queued Discord alerts have been delivered."""
+    return get_dispatcher().flush(timeout)
@@ -0,0 +1,116 @@
+import io
+import logging
+import pandas as pd
+from sqlalchemy import select
+from config.settings import MARKET_TZ
+import database
+from database import DailyPrice, Stock
+
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+DB_COLUMNS = ['time', 'ticker', 'open', 'high', 'low', 'close', 'volume']
+
+# COPY into a temp table, then one set-based upsert into the hypertable
+_PG_STAGE = "CREATE TEMP TABLE tmp_daily_prices (LIKE daily_prices INCLUDING DEFAULTS) ON COMMIT DROP"
+_PG_COPY = f"COPY tmp_daily_prices ({', '.join(DB_COLUMNS)}) FROM STDIN WITH (FORMAT csv)"
+_PG_MERGE = f"""
+    INSERT INTO daily_prices ({', '.join(DB_COLUMNS)})
+    SELECT {', '.join(DB_COLUMNS)} FROM tmp_daily_prices
+    ON CONFLICT (time, ticker) DO UPDATE SET
+        open = EXCLUDED.open, high = EXCLUDED.high, low = EXCLUDED.low,
+        close = EXCLUDED.close, volume = EXCLUDED.volume
+"""
+
+
+def _to_rows(histories):
+    """Flattens {ticker: OHLCV} into one long frame; sessions are stored as naive market-local dates."""
+    parts = []
+    for ticker, df in histories.items():
+        if df is None or df.empty:
+            continue
+        index = df.index
+        if index.tz is not None:
+            index = index.tz_convert(MARKET_TZ).tz_localize(None)
+        parts.append(pd.DataFrame({
+            'time': index,
+            'ticker': ticker,
+            'open': df['Open'].to_numpy(),
+            'high': df['High'].to_numpy(),
+            'low': df['Low'].to_numpy(),
+            'close': df['Close'].to_numpy(),
+            'volume': df['Volume'].to_numpy(dtype='int64'),
+        }))
+    if not parts:
+        return None
+    return pd.concat(parts, ignore_index=True)
+
+
+def _copy_upsert(conn, rows):
+    """Postgres path: COPY the batch into a temp table and merge it with ON CONFLICT."""
+    buf = io.StringIO()
+    rows.to_csv(buf, index=False, header=False)
+    buf.seek(0)
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.execute(_PG_STAGE)
+        cursor.copy_expert(_PG_COPY, buf)
+        cursor.execute(_PG_MERGE)
+    finally:
+        cursor.close()
+
+
+def _executemany_upsert(conn, rows):
+    """Portable path (SQLite): executemany INSERT ... ON CONFLICT DO UPDATE."""
+    stmt = database.dialect_insert(DailyPrice.__table__)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['time', 'ticker'],
+        set_={c: stmt.excluded[c] for c in ['open', 'high', 'low', 'close', 'volume']})
+    conn.execute(stmt, rows.to_dict('records'))
+
+
+def write_prices(histories):
+    """Upserts {ticker: OHLCV} bars into daily_prices in one transaction; returns the rows written."""
+    if database.engine is None:
+        logging.warning("DATABASE_URL not set. Skipping price ingestion.")
+        return 0
+    rows = _to_rows(histories)
+    if rows is None:
+        return 0
+
+    stocks = [{"ticker": t, "name": t, "sector": "Unknown"}
+              for t in rows['ticker'].unique()]
+    with database.engine.begin() as conn:
+        # daily_prices.ticker references stocks
+        conn.execute(database.dialect_insert(Stock.__table__).on_conflict_do_nothing(
+            index_elements=['ticker']), stocks)
+        if conn.dialect.name == "postgresql":
+            _copy_upsert(conn, rows)
+        else:
+            _executemany_upsert(conn, rows)
+    return len(rows)
+
+
+def read_prices(tickers, start=None):
+    """Reads {ticker: OHLCV} for many tickers with one (ticker, time) range query."""
+    if database.engine is None:
+        raise RuntimeError("MARKET_DATA_SOURCE=db requires DATABASE_URL")
+
+    query = select(*[DailyPrice.__table__.c[c] for c in DB_COLUMNS]).where(
+        DailyPrice.ticker.in_(list(tickers)))
+    if start is not None:
+        start = pd.Timestamp(start)
+        if start.tz is not None:
+            start = start.tz_convert(MARKET_TZ).tz_localize(None)
+        query = query.where(DailyPrice.time >= start.to_pydatetime())
+    query = query.order_by(DailyPrice.ticker, DailyPrice.time)
+
+    with database.engine.connect() as conn:
+        data = pd.read_sql(query, conn, parse_dates=['time'])
+
+    frames = {}
+    for ticker, group in data.groupby('ticker', sort=False):
+        df = group.drop(columns='ticker').set_index('time')
+        df.index = df.index.tz_localize(MARKET_TZ)
+        df.index.name = 'Date'
+        df.columns = PRICE_COLUMNS
+        frames[ticker] = df.astype({'Volume': 'int64'})
+    return frames
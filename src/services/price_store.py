@@ -0,0 +1,47 @@
+import os
+import logging
+import pandas as pd
+from config.settings import PRICE_STORE_DIR
+
+
+def store_path(ticker):
+    """Returns the Parquet partition path for a ticker."""
+    return os.path.join(PRICE_STORE_DIR, f"{ticker}.parquet")
+
+
+def load(ticker):
+    """Loads stored OHLCV bars for a ticker, or None if nothing is stored."""
+    path = store_path(ticker)
+    if not os.path.exists(path):
+        return None
+    try:
+        return pd.read_parquet(path)
+    except Exception as e:
+        logging.error(f"Corrupt price store for {ticker}, ignoring: {e}")
+        return None
+
+
+def save(ticker, df):
+    """Writes OHLCV bars for a ticker (atomic replace, safe for concurrent readers)."""
+    os.makedirs(PRICE_STORE_DIR, exist_ok=True)
+    path = store_path(ticker)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        df.to_parquet(tmp_path)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        logging.error(f"Failed to write price store for {ticker}: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def merge(stored, fresh):
+    """Merges freshly downloaded bars into stored bars (fresh rows win on overlap)."""
+    if stored is None or stored.empty:
+        return fresh
+    if fresh is None or fresh.empty:
+        return stored
+    if fresh.index.tz is not None and stored.index.tz is not None:
+        fresh = fresh.tz_convert(stored.index.tz)
+    kept = stored[~stored.index.isin(fresh.index)]
+    return pd.concat([kept, fresh]).sort_index()
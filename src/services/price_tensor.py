@@ -0,0 +1,197 @@
+import json
+import logging
+import os
+import threading
+import time
+import numpy as np
+import pandas as pd
+from config.settings import MARKET_TZ, UNIVERSE_DIR
+
+# On-disk universe panel, opened with numpy.memmap:
+#   prices-<stamp>.f32  (tickers, days, 4) float32 Open/High/Low/Close, NaN where a ticker has no bar
+#   volume-<stamp>.i64  (tickers, days) int64
+#   meta.json           calendar, ticker map, per-ticker first/last bar, data file names
+# Opening reads only meta.json; pages of the data files are faulted in as slices are read.
+
+FORMAT_VERSION = 1
+PRICE_FIELDS = ['Open', 'High', 'Low', 'Close']
+META_FILE = "meta.json"
+
+
+def _sessions(index):
+    """Market-local trading days of a bar index as datetime64[D]."""
+    if index.tz is not None:
+        index = index.tz_convert(MARKET_TZ).tz_localize(None)
+    return index.normalize().to_numpy().astype('datetime64[D]')
+
+
+def write_tensor(histories, directory=UNIVERSE_DIR):
+    """
+    Writes {ticker: OHLCV} as a memory-mappable panel on the union calendar; returns the ticker count.
+
+    Data files get fresh names and meta.json is swapped in last (atomic replace), so
+    readers holding the previous mapping keep a consistent view until they reopen.
+    """
+    histories = {t: df for t, df in histories.items() if df is not None and not df.empty}
+    if not histories:
+        return 0
+    tickers = sorted(histories)
+    sessions = {t: _sessions(histories[t].index) for t in tickers}
+    calendar = np.unique(np.concatenate(list(sessions.values())))
+
+    os.makedirs(directory, exist_ok=True)
+    stamp = f"{time.strftime('%Y%m%d%H%M%S')}-{time.time_ns() % 10**9:09d}-{os.getpid()}"
+    prices_file, volume_file = f"prices-{stamp}.f32", f"volume-{stamp}.i64"
+    shape = (len(tickers), len(calendar))
+
+    prices = np.memmap(os.path.join(directory, prices_file), dtype=np.float32, mode='w+', shape=shape + (4,))
+    volume = np.memmap(os.path.join(directory, volume_file), dtype=np.int64, mode='w+', shape=shape)
+    prices[:] = np.nan
+
+    first, last, gaps = [], [], []
+    for i, ticker in enumerate(tickers):
+        df = histories[ticker]
+        days = np.searchsorted(calendar, sessions[ticker])
+        prices[i, days] = df[PRICE_FIELDS].to_numpy(dtype=np.float32)
+        volume[i, days] = df['Volume'].to_numpy(dtype=np.int64)
+        first.append(int(days[0]))
+        last.append(int(days[-1]) + 1)
+        # Sessions inside the ticker's range where it didn't trade (suspensions)
+        gaps.append(int(days[-1] - days[0] + 1 - len(days)))
+    prices.flush()
+    volume.flush()
+    del prices, volume
+
+    meta = {
+        'version': FORMAT_VERSION,
+        'tz': MARKET_TZ,
+        'fields': PRICE_FIELDS + ['Volume'],
+        'prices_file': prices_file,
+        'volume_file': volume_file,
+        'tickers': tickers,
+        'calendar': [str(d) for d in calendar],
+        'first': first,
+        'last': last,
+        'gaps': gaps,
+    }
+    meta_path = os.path.join(directory, META_FILE)
+    previous = None
+    if os.path.exists(meta_path):
+        try:
+            with open(meta_path) as f:
+                previous = json.load(f)
+        except Exception:
+            previous = None
+    tmp_path = f"{meta_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, meta_path)
+
+    # Old data files can go now; open mappings keep their pages until closed
+    if previous:
+        for name in (previous.get('prices_file'), previous.get('volume_file')):
+            if name and name not in (prices_file, volume_file):
+                try:
+                    os.remove(os.path.join(directory, name))
+                except OSError:
+                    pass
+    return len(tickers)
+
+
+class PriceTensor:
+    """Read-only memory-mapped universe panel; per-ticker slices are views, not copies."""
+
+    def __init__(self, directory=UNIVERSE_DIR):
+        self.directory = directory
+        meta_path = os.path.join(directory, META_FILE)
+        self.mtime = os.path.getmtime(meta_path)
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta.get('version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported universe format {meta.get('version')} in {directory}")
+
+        self.tickers = meta['tickers']
+        self.ticker_index = {t: i for i, t in enumerate(self.tickers)}
+        self.calendar = np.array(meta['calendar'], dtype='datetime64[D]')
+        self.first = np.array(meta['first'], dtype=np.int64)
+        self.last = np.array(meta['last'], dtype=np.int64)
+        self.gaps = np.array(meta['gaps'], dtype=np.int64)
+        shape = (len(self.tickers), len(self.calendar))
+        self.prices = np.memmap(os.path.join(directory, meta['prices_file']), dtype=np.float32,
+                                mode='r', shape=shape + (4,))
+        self.volume = np.memmap(os.path.join(directory, meta['volume_file']), dtype=np.int64,
+                                mode='r', shape=shape)
+        # Built once; per-ticker frames slice it
+        self.index = pd.DatetimeIndex(self.calendar.astype('datetime64[ns]'), name='Date').tz_localize(MARKET_TZ)
+
+    def __contains__(self, ticker):
+        return ticker in self.ticker_index
+
+    def __len__(self):
+        return len(self.tickers)
+
+    def day_index(self, start):
+        """First calendar position on or after `start` (None = 0)."""
+        if start is None:
+            return 0
+        start = pd.Timestamp(start)
+        if start.tz is not None:
+            start = start.tz_convert(MARKET_TZ).tz_localize(None)
+        return int(np.searchsorted(self.calendar, np.datetime64(start.date(), 'D')))
+
+    def bounds(self, ticker, start=None):
+        """(row, first day, end day) of a ticker's bars from `start`, or None if it has none."""
+        row = self.ticker_index.get(ticker)
+        if row is None:
+            return None
+        lo = max(int(self.first[row]), self.day_index(start))
+        hi = int(self.last[row])
+        return (row, lo, hi) if lo < hi else None
+
+    def arrays(self, ticker, start=None):
+        """(prices (N, 4) float32 view, volume (N,) int64 view, tz-aware index) for a ticker, or None."""
+        b = self.bounds(ticker, start)
+        if b is None:
+            return None
+        row, lo, hi = b
+        return self.prices[row, lo:hi], self.volume[row, lo:hi], self.index[lo:hi]
+
+    def history(self, ticker, start=None):
+        """A ticker's OHLCV as a DataFrame over the mapped prices (float32 prices, int64 volume)."""
+        sliced = self.arrays(ticker, start)
+        if sliced is None:
+            return None
+        prices, volume, index = sliced
+        df = pd.DataFrame(prices, index=index, columns=PRICE_FIELDS, copy=False)
+        df['Volume'] = volume
+        if self.gaps[self.ticker_index[ticker]]:
+            df = df[~np.isnan(prices[:, 3])]  # Suspended sessions: no bar, like Yahoo
+        return df
+
+    def histories(self, tickers, start=None):
+        """{ticker: OHLCV} for every requested ticker present in the panel."""
+        frames = {}
+        for ticker in tickers:
+            df = self.history(ticker, start)
+            if df is not None and not df.empty:
+                frames[ticker] = df
+        return frames
+
+
+_tensor = None
+_lock = threading.Lock()
+
+
+def get_price_tensor(directory=UNIVERSE_DIR):
+    """Process-wide PriceTensor, reopened when the panel has been rewritten since it was mapped."""
+    global _tensor
+    meta_path = os.path.join(directory, META_FILE)
+    with _lock:
+        try:
+            mtime = os.path.getmtime(meta_path)
+        except OSError:
+            logging.error(f"No universe panel in {directory}; build it with src/build_universe.py")
+            return None
+        if _tensor is None or _tensor.directory != directory or _tensor.mtime != mtime:
+            _tensor = PriceTensor(directory)
+        return _tensor
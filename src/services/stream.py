@@ -0,0 +1,233 @@
+import json
+import logging
+import queue
+import socket
+import threading
+import time
+import numpy as np
+import pandas as pd
+from config.settings import MARKET_TZ, STREAM_BATCH_MS, STREAM_REPLAY_DELAY
+from services import ai_engine, technical_analysis
+
+# Buffer columns: the screener frame's OHLCV plus running OBV
+BUFFER_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume', 'OBV']
+OPEN, HIGH, LOW, CLOSE, VOLUME, OBV = range(6)
+
+
+def parse_bar(line):
+    """
+    Parses one line-delimited JSON bar update:
+    {"ticker": "BBCA.JK", "time": "2026-02-06T10:15:00+07:00", "open": .., "high": .., "low": .., "close": .., "volume": ..}
+    The values describe the session's daily bar so far (volume is cumulative for the day).
+    Naive times are taken as exchange-local.
+    """
+    msg = json.loads(line)
+    ticker = str(msg['ticker']).strip().upper()
+    if not ticker.endswith('.JK'):
+        ticker = f"{ticker}.JK"
+    ts = msg['time']
+    ts = pd.Timestamp(ts, unit='s', tz='UTC') if isinstance(ts, (int, float)) else pd.Timestamp(ts)
+    if ts.tz is not None:
+        ts = ts.tz_convert(MARKET_TZ).tz_localize(None)
+    return {
+        'ticker': ticker,
+        'session': np.datetime64(ts.date(), 'D'),  # Exchange-local trading day
+        'values': (float(msg['open']), float(msg['high']), float(msg['low']),
+                   float(msg['close']), float(msg['volume'])),
+    }
+
+
+class ReplaySource:
+    """Replays bar updates from a line-delimited JSON file (delay seconds between lines, 0 = as fast as possible)."""
+
+    def __init__(self, path, delay=STREAM_REPLAY_DELAY):
+        self.path = path
+        self.delay = delay
+
+    def __iter__(self):
+        with open(self.path) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                yield parse_bar(line)
+                if self.delay:
+                    time.sleep(self.delay)
+
+
+class SocketSource:
+    """Reads line-delimited JSON bar updates from a TCP feed until the server closes the connection."""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+
+    def __iter__(self):
+        with socket.create_connection((self.host, self.port)) as sock:
+            with sock.makefile('r', encoding='utf-8') as lines:
+                for line in lines:
+                    if line.strip():
+                        yield parse_bar(line)
+
+
+def open_source(spec):
+    """'tcp://host:port' reads a socket feed; anything else is a replay file path."""
+    if spec.startswith("tcp://"):
+        host, port = spec[len("tcp://"):].rsplit(":", 1)
+        return SocketSource(host, int(port))
+    return ReplaySource(spec)
+
+
+class TickerBuffer:
+    """
+    Fixed-length ring buffer of one ticker's daily bars (oldest slot overwritten by a new session).
+
+    The newest slot is the live session: updates for the same day overwrite it and
+    its OBV is re-derived from the previous bar, so OBV stays O(1) per update.
+    """
+
+    def __init__(self, df):
+        self.capacity = len(df)
+        self.data = df[BUFFER_COLUMNS].to_numpy(dtype=np.float64).copy()
+        self.tz = df.index.tz
+        index = df.index.tz_localize(None) if self.tz is not None else df.index
+        self.sessions = index.normalize().to_numpy().astype('datetime64[D]')
+        self.head = 0  # Slot holding the oldest bar
+
+    @property
+    def last(self):
+        return (self.head - 1) % self.capacity
+
+    def update(self, session, values):
+        """Applies a bar update for a trading day; returns True if the buffer changed."""
+        last = self.last
+        if session < self.sessions[last]:
+            return False  # Late update for a closed session
+
+        if session == self.sessions[last]:
+            slot, prev = last, (last - 1) % self.capacity
+            if tuple(self.data[slot, :VOLUME + 1]) == values:
+                return False
+        else:
+            slot, prev = self.head, last
+            self.head = (self.head + 1) % self.capacity
+
+        prev_close, prev_obv = self.data[prev, CLOSE], self.data[prev, OBV]
+        close, volume = values[CLOSE], values[VOLUME]
+        self.data[slot, :VOLUME + 1] = values
+        self.data[slot, OBV] = prev_obv + (volume if close > prev_close else -volume if close < prev_close else 0.0)
+        self.sessions[slot] = session
+        return True
+
+    def arrays(self):
+        """Bars oldest-first as an (N, 6) array."""
+        if self.head == 0:
+            return self.data
+        return np.concatenate((self.data[self.head:], self.data[:self.head]))
+
+    def frame(self):
+        """Bars oldest-first as a screener-style DataFrame (for trade setup, charts and alerts)."""
+        order = np.r_[self.head:self.capacity, 0:self.head]
+        index = pd.DatetimeIndex(self.sessions[order].astype('datetime64[ns]'))
+        if self.tz is not None:
+            index = index.tz_localize(self.tz)
+        df = pd.DataFrame(self.data[order], index=index, columns=BUFFER_COLUMNS)
+        return df.astype({'Volume': 'int64'})
+
+
+class StreamScanner:
+    """
+    Incremental Wyckoff scanner over a stream of bar updates.
+
+    Updates are applied in micro-batches (whatever arrives within STREAM_BATCH_MS);
+    only tickers whose buffer changed are re-filtered, and only their survivors go
+    through one batched LSTM forward pass. `on_hit(ticker, buffer, filters, score)`
+    fires once per ticker per session when it first crosses the score threshold.
+    `on_idle()`, if given, runs on the scan loop after every batch and about once a
+    second while no bars arrive (e.g. to send finished alerts and flush results).
+    """
+
+    IDLE_SECONDS = 1.0
+
+    def __init__(self, frames, model, on_hit, threshold=0.75, batch_ms=STREAM_BATCH_MS, on_idle=None):
+        self.buffers = {t: TickerBuffer(df) for t, df in frames.items() if df is not None and len(df) > 1}
+        self.model = model
+        self.on_hit = on_hit
+        self.on_idle = on_idle
+        self.threshold = threshold
+        self.batch_window = batch_ms / 1000
+        self.alerted = {}  # ticker -> session already alerted
+        self.bars = 0
+        self.hits = 0
+
+    def process(self, bars):
+        """Applies a batch of bar updates and re-scores the tickers that changed; returns the tickers scored."""
+        changed = {}
+        for bar in bars:
+            buffer = self.buffers.get(bar['ticker'])
+            if buffer is not None and buffer.update(bar['session'], bar['values']):
+                changed[bar['ticker']] = bar['session']
+        self.bars += len(bars)
+
+        survivors = {}
+        for ticker in changed:
+            data = self.buffers[ticker].arrays()
+            passed, _, filters = technical_analysis.evaluate_filters(
+                data[:, CLOSE], data[:, LOW], data[:, VOLUME], data[:, OBV])
+            if passed:
+                survivors[ticker] = (data, filters)
+
+        scores = ai_engine.score_batch(self.model, {t: data[:, :VOLUME + 1] for t, (data, _) in survivors.items()})
+        for ticker, (_, filters) in survivors.items():
+            score = scores[ticker]
+            if score >= self.threshold and self.alerted.get(ticker) != changed[ticker]:
+                self.alerted[ticker] = changed[ticker]
+                self.hits += 1
+                self.on_hit(ticker, self.buffers[ticker], filters, score)
+        return len(survivors)
+
+    def _read(self, source, q):
+        try:
+            for bar in source:
+                q.put(bar)
+        except Exception as e:
+            logging.error(f"Bar source failed: {e}")
+        finally:
+            q.put(None)
+
+    def run(self, source):
+        """Consumes the source until it ends (or Ctrl+C), processing micro-batches as they arrive."""
+        q = queue.Queue()
+        threading.Thread(target=self._read, args=(source, q), name="bar-source", daemon=True).start()
+
+        done = False
+        try:
+            while not done:
+                try:
+                    bar = q.get(timeout=self.IDLE_SECONDS)
+                except queue.Empty:
+                    if self.on_idle:
+                        self.on_idle()
+                    continue
+                if bar is None:
+                    break
+                batch = [bar]
+                deadline = time.monotonic() + self.batch_window
+                while True:
+                    try:
+                        bar = q.get(timeout=max(0.0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        break
+                    if bar is None:
+                        done = True
+                        break
+                    batch.append(bar)
+
+                started = time.perf_counter()
+                scored = self.process(batch)
+                elapsed = (time.perf_counter() - started) * 1000
+                print(f"   {self.bars:,} bars | batch {len(batch)} → {scored} scored in {elapsed:.1f} ms | {self.hits} hits",
+                      end="\r")
+                if self.on_idle:
+                    self.on_idle()
+        except KeyboardInterrupt:
+            print("\n⏹️ Stream stopped.")
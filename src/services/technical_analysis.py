@@ -1,7 +1,37 @@
 import numpy as np
-from sklearn.linear_model import LinearRegression
+import pandas as pd
 from config.settings import LOW_PCT_THRESHOLD, STD_DEV_THRESHOLD, MIN_PRICE, RISK_PCT, CAPITAL_IDR, MIN_AVG_VOLUME
 
+# Filter windows / thresholds shared by check_filters and filter_series
+AVG_VOLUME_DAYS = 20
+SPIKE_DAYS = 10
+VOLUME_SPIKE_MULT = 1.5
+VOLATILITY_DAYS = 30
+OBV_SLOPE_DAYS = 20
+OBV_SLOPE_MIN = 0.05
+
+# resolve_exits: Close-only checks, or intrabar High/Low with the side assumed to fill first
+EXIT_MODES = ("close", "stop_first", "target_first")
+
+
+# check_filters rejection reason prefix -> stage name (same names as filter_series columns)
+REJECTION_STAGES = (
+    ("Volume too low", "liquidity"),
+    ("No Volume Spike", "spike"),
+    ("Price below", "min_price"),
+    ("Price too high", "dist_from_low"),
+    ("Volatility too high", "volatility"),
+    ("Weak OBV", "obv_slope"),
+)
+
+
+def rejection_stage(reason):
+    """Maps a check_filters rejection reason to the filter stage that rejected it."""
+    for prefix, stage in REJECTION_STAGES:
+        if reason.startswith(prefix):
+            return stage
+    return "other"
+
 
 def check_filters(df):
     """
@@ -11,17 +41,23 @@ def check_filters(df):
     3. Low Volatility (Sideways)
     4. Rising OBV Trend
     """
-    current_price = df['Close'].iloc[-1]
+    return evaluate_filters(df['Close'].to_numpy(dtype=np.float64), df['Low'].to_numpy(dtype=np.float64),
+                            df['Volume'].to_numpy(dtype=np.float64), df['OBV'].to_numpy(dtype=np.float64))
+
+
+def evaluate_filters(close, low, volume, obv):
+    """check_filters on plain arrays (oldest bar first), so callers holding raw buffers skip DataFrame overhead."""
+    current_price = close[-1]
 
     # 0. Liquidity Filter (Avg Volume > X)
-    avg_vol = df['Volume'].tail(20).mean()
+    avg_vol = volume[-AVG_VOLUME_DAYS:].mean()
     if avg_vol < MIN_AVG_VOLUME:
         return False, f"Volume too low ({avg_vol:,.0f} < {MIN_AVG_VOLUME:,.0f})", None
 
     # 0.5 Volume Spike Check (Instituional Footprint)
     # Require at least one day in last 10 where Vol > 1.5x Avg
-    recent_vol = df['Volume'].tail(10)
-    vol_spike = (recent_vol > (avg_vol * 1.5)).any()
+    recent_vol = volume[-SPIKE_DAYS:]
+    vol_spike = (recent_vol > (avg_vol * VOLUME_SPIKE_MULT)).any()
     if not vol_spike:
         return False, "No Volume Spike (Passive)", None
 
@@ -30,15 +66,15 @@ def check_filters(df):
         return False, f"Price below {MIN_PRICE}", None
 
     # 1. Price Location (Within X% of 52-week low)
-    low_52w = df['Low'].min()
+    low_52w = low.min()
     dist_from_low = (current_price - low_52w) / low_52w
 
     if dist_from_low > LOW_PCT_THRESHOLD:
         return False, f"Price too high (> {LOW_PCT_THRESHOLD*100:.0f}% from low)", None
 
     # 2. Sideways Filter (Low Volatility on Close over last 30 days)
-    recent = df['Close'].tail(30)
-    std_dev = recent.std()
+    recent = close[-VOLATILITY_DAYS:]
+    std_dev = recent.std(ddof=1)
     mean_price = recent.mean()
     volatility = std_dev / mean_price
 
@@ -46,13 +82,10 @@ def check_filters(df):
         return False, f"Volatility too high (> {STD_DEV_THRESHOLD*100:.0f}%)", None
 
     # 3. OBV Confirmation (Rising Trend over last 20 days)
-    obv_recent = df['OBV'].tail(20).values
-    x = np.arange(len(obv_recent)).reshape(-1, 1)
-    y = obv_recent.reshape(-1, 1)
-    reg = LinearRegression().fit(x, y)
-    obv_slope = reg.coef_[0][0]
+    obv_recent = obv[-OBV_SLOPE_DAYS:]
+    obv_slope = rolling_slope(obv_recent, OBV_SLOPE_DAYS)[-1]
 
-    if obv_slope <= 0.05:  # Strict Accumulation Slope
+    if obv_slope <= OBV_SLOPE_MIN:  # Strict Accumulation Slope
         return False, f"Weak OBV ({obv_slope:.2f})", None
 
     return True, "Passed", {
@@ -62,6 +95,104 @@ def check_filters(df):
     }
 
 
+def rolling_slope(values, window):
+    """
+    Least-squares slope of y against x = 0..n-1 over a trailing window, for every bar, in O(N).
+
+    Uses closed-form x moments plus rolling sums of y and x*y (via cumulative sums).
+    The first window-1 bars use the shorter window available, like tail(window).
+    Matches sklearn LinearRegression().fit(x, y).coef_ to floating-point tolerance.
+    """
+    y = np.asarray(values, dtype=np.float64)
+    if len(y) == 0:
+        return y
+    # Slope is offset-invariant; centring keeps the cumulative sums small and precise
+    y = y - y.mean()
+    k = np.arange(len(y), dtype=np.float64)
+
+    cum_y = np.concatenate(([0.0], np.cumsum(y)))
+    cum_ky = np.concatenate(([0.0], np.cumsum(k * y)))
+
+    end = np.arange(1, len(y) + 1)
+    start = np.maximum(end - window, 0)
+    n = (end - start).astype(np.float64)
+
+    sum_y = cum_y[end] - cum_y[start]
+    # Re-base x to 0 at the start of each window
+    sum_xy = (cum_ky[end] - cum_ky[start]) - start * sum_y
+
+    sum_x = n * (n - 1) / 2
+    sum_xx = (n - 1) * n * (2 * n - 1) / 6
+    denom = n * sum_xx - sum_x * sum_x
+
+    slope = np.zeros(len(y))
+    valid = denom > 0
+    slope[valid] = (n[valid] * sum_xy[valid] - sum_x[valid]
+                    * sum_y[valid]) / denom[valid]
+    return slope
+
+
+def filter_series(df, window=None):
+    """
+    Vectorized companion of check_filters over a full history.
+
+    Row t holds what check_filters would compute on the bars ending at t
+    (window=None: all bars from the start of df, like the screener;
+    window=N: the last N bars only, like a backtest window).
+    Returns a DataFrame aligned to df.index with one column per filter stage.
+    """
+    close = df['Close']
+    volume = df['Volume']
+
+    # 0. Liquidity + Volume Spike
+    avg_vol = volume.rolling(AVG_VOLUME_DAYS, min_periods=1).mean()
+    max_recent_vol = volume.rolling(SPIKE_DAYS, min_periods=1).max()
+
+    # 1. Price Location (window low)
+    if window is None:
+        low = df['Low'].cummin()
+    else:
+        low = df['Low'].rolling(window, min_periods=1).min()
+    dist_from_low = (close - low) / low
+
+    # 2. Sideways Filter
+    recent = close.rolling(VOLATILITY_DAYS, min_periods=1)
+    volatility = recent.std() / recent.mean()
+
+    # 3. OBV Confirmation
+    obv_slope = pd.Series(rolling_slope(
+        df['OBV'].to_numpy(), OBV_SLOPE_DAYS), index=df.index)
+
+    stages = pd.DataFrame({
+        'liquidity': avg_vol >= MIN_AVG_VOLUME,
+        'spike': max_recent_vol > avg_vol * VOLUME_SPIKE_MULT,
+        'min_price': close >= MIN_PRICE,
+        'dist_from_low': dist_from_low,
+        'volatility': volatility,
+        'obv_slope': obv_slope,
+    }, index=df.index)
+
+    # Comparisons are written as "not rejected" so NaNs behave like the scalar checks
+    stages['passed'] = (
+        stages['liquidity'] & stages['spike'] & stages['min_price'] &
+        ~(dist_from_low > LOW_PCT_THRESHOLD) &
+        ~(volatility > STD_DEV_THRESHOLD) &
+        ~(obv_slope <= OBV_SLOPE_MIN)
+    )
+    return stages
+
+
+def position_lots(entry, sl, capital=CAPITAL_IDR, risk_pct=RISK_PCT):
+    """
+    Lots (1 Lot = 100 shares) that risk `risk_pct` of `capital` between entry and stop loss.
+    Works on scalars or NumPy arrays; no position when the stop is not below entry.
+    """
+    risk_per_share = np.asarray(entry, dtype=np.float64) - sl
+    with np.errstate(divide='ignore', invalid='ignore'):
+        position_size = np.where(risk_per_share > 0, np.floor(capital * risk_pct / risk_per_share), 0)
+    return np.nan_to_num(position_size, nan=0.0).astype(np.int64) // 100
+
+
 def calculate_trade_setup(df):
     """Calculates entry, stop loss, and position size."""
     close = df['Close'].iloc[-1]
@@ -81,16 +212,8 @@ def calculate_trade_setup(df):
     sl_pct = (entry - sl) / entry * 100
 
     # Money Management
-    risk_amount = CAPITAL_IDR * RISK_PCT
     risk_per_share = entry - sl
-
-    if risk_per_share <= 0:
-        position_size = 0
-    else:
-        position_size = int(risk_amount / risk_per_share)
-
-    # Convert to Lots (1 Lot = 100 shares)
-    lots = position_size // 100
+    lots = int(position_lots(entry, sl))
     capital_required = lots * 100 * entry
     potential_loss = lots * 100 * risk_per_share
 
@@ -117,3 +240,85 @@ def calculate_trade_setup(df):
         "profit_per_lot": profit_per_lot,
         "recommendation": recommendation
     }
+
+
+def trade_levels(df):
+    """
+    calculate_trade_setup's entry reference, stop loss and target for a position opened
+    on every bar at once: row i holds the setup of the bars before it (df.iloc[:i]).
+    Returns (entry, sl, tp) float arrays; row 0 is NaN.
+    """
+    entry = df['Close'].shift(1).to_numpy(dtype=np.float64)
+    sl = df['Low'].rolling(10, min_periods=1).min().shift(1).to_numpy(dtype=np.float64) * 0.98
+    tp = entry + (entry - sl) * 2.5
+    return entry, sl, tp
+
+
+def resolve_exits(entries, sl, tp, high, low, close, open_=None, mode="close"):
+    """
+    Resolves many trades at once: for a position opened at the close of bar entries[k],
+    finds the first later bar that reaches its stop loss sl[k] or target tp[k].
+
+    mode="close" compares only the Close, like the original bar-by-bar simulator.
+    "stop_first" / "target_first" use each bar's Low/High and, when one bar spans both
+    levels, assume that side filled first. With `open_`, a gap through a level fills at the Open.
+    Returns a dict of arrays aligned to `entries`: exit_idx (-1 while still open),
+    exit_price (NaN while open), outcome ('WIN' / 'LOSS' / 'OPEN') and holding
+    (bars from entry to exit, or to the last bar while open).
+    """
+    if mode not in EXIT_MODES:
+        raise ValueError(f"Unknown exit mode '{mode}' (expected one of: {', '.join(EXIT_MODES)})")
+
+    entries = np.asarray(entries, dtype=np.int64)
+    sl = np.asarray(sl, dtype=np.float64)[:, None]
+    tp = np.asarray(tp, dtype=np.float64)[:, None]
+    close = np.asarray(close, dtype=np.float64)
+    n = len(close)
+    if len(entries) == 0:
+        return {'exit_idx': entries.copy(), 'exit_price': np.zeros(0), 'outcome': np.zeros(0, dtype='<U4'),
+                'holding': entries.copy()}
+
+    if mode == "close":
+        high = low = close
+    else:
+        high = np.asarray(high, dtype=np.float64)
+        low = np.asarray(low, dtype=np.float64)
+
+    # Bars after each entry as rows of a (trades, horizon) matrix; NaN padding never hits
+    horizon = max(n - 1 - int(entries.min()), 1)
+
+    def after_entry(values):
+        padded = np.concatenate((values, np.full(horizon, np.nan)))
+        return np.lib.stride_tricks.sliding_window_view(padded, horizon)[entries + 1]
+
+    # First hit of each level = argmax of the boolean rows (horizon when never hit)
+    stop_hit = after_entry(low) <= sl
+    target_hit = after_entry(high) >= tp
+    first_stop = np.where(stop_hit.any(axis=1), stop_hit.argmax(axis=1), horizon)
+    first_target = np.where(target_hit.any(axis=1), target_hit.argmax(axis=1), horizon)
+    first = np.minimum(first_stop, first_target)
+    resolved = first < horizon
+    exit_idx = np.where(resolved, entries + 1 + first, -1)
+    bar = np.where(resolved, exit_idx, 0)
+    sl, tp = sl[:, 0], tp[:, 0]
+
+    # A bar reaching both levels: the configured side wins, unless the Open gapped through one
+    is_loss = (first_stop < first_target) | ((first_stop == first_target) & (mode != "target_first"))
+    if open_ is not None and mode != "close":
+        bar_open = np.asarray(open_, dtype=np.float64)[bar]
+        both = first_stop == first_target
+        is_loss = np.where(both & (bar_open <= sl), True, np.where(both & (bar_open >= tp), False, is_loss))
+
+    if mode == "close":
+        exit_price = close[bar]
+    else:
+        exit_price = np.where(is_loss, sl, tp)
+        if open_ is not None:
+            exit_price = np.where(is_loss, np.minimum(sl, bar_open), np.maximum(tp, bar_open))
+
+    return {
+        'exit_idx': exit_idx,
+        'exit_price': np.where(resolved, exit_price, np.nan),
+        'outcome': np.where(resolved, np.where(is_loss, 'LOSS', 'WIN'), 'OPEN'),
+        'holding': np.where(resolved, exit_idx, n - 1) - entries,
+    }
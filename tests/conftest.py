@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Scripts import `services` and `config` from src/, like `python src/<script>.py` does
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
@@ -0,0 +1,84 @@
+import contextlib
+import numpy as np
+import pandas as pd
+
+import portfolio_backtest
+from config.settings import LOOKBACK_DAYS
+
+DAYS = LOOKBACK_DAYS + 10
+
+
+def test_calendar_days_maps_missing_dates_forward():
+    calendar = pd.DatetimeIndex(["2024-01-02", "2024-01-03", "2024-01-05"])
+    dates = pd.DatetimeIndex(["2024-01-03", "2024-01-04", "2024-01-08"])
+    assert portfolio_backtest.calendar_days(calendar, dates).tolist() == [1, 2, -1]
+
+
+def test_position_closes_when_exit_bar_is_missing_from_calendar():
+    # One ticker trading every session; its exit bar is missing from the union calendar
+    sessions = pd.bdate_range("2024-01-01", periods=DAYS + 1)
+    entry, exit_bar = LOOKBACK_DAYS + 2, LOOKBACK_DAYS + 5
+    calendar = sessions.delete(exit_bar)
+
+    shape = (1, len(calendar))
+    panel = {name: np.full(shape, np.nan) for name in ('score', 'sl', 'sizing_price', 'exit_price')}
+    panel['close'] = np.full(shape, 100.0)
+    panel['entry'] = np.zeros(shape, dtype=bool)
+    panel['win'] = np.zeros(shape, dtype=bool)
+    panel['exit_day'] = np.full(shape, -1)
+    panel['entry'][0, entry] = True
+    panel['score'][0, entry] = 0.9
+    panel['sl'][0, entry] = 95.0
+    panel['sizing_price'][0, entry] = 100.0
+    panel['exit_price'][0, entry] = 110.0
+    panel['win'][0, entry] = True
+    panel['exit_day'][0, entry] = portfolio_backtest.calendar_days(calendar, sessions[[exit_bar]])[0]
+    panel['tickers'] = ["AAAA.JK"]
+    panel['calendar'] = calendar
+
+    curve, trades = portfolio_backtest.simulate(panel, capital=100_000_000, risk_pct=0.01, fee_buy=0, fee_sell=0)
+
+    assert len(trades) == 1
+    assert trades['exit_date'].iloc[0] == calendar[exit_bar]  # The next session on the calendar
+    assert trades['result'].iloc[0] == 'WIN'
+    assert curve['positions'].iloc[-1] == 0
+    assert curve['exposure'].iloc[-1] == 0
+    assert curve['equity'].iloc[-1] > 100_000_000
+
+
+def test_build_panel_maps_exits_by_date(monkeypatch):
+    # AAAA's window starts before the trimmed calendar; its exit must land on the same date
+    long = pd.bdate_range("2024-01-01", periods=DAYS)
+    later = pd.bdate_range(long[5], periods=DAYS)
+    frames = {
+        "AAAA.JK": pd.DataFrame({'Close': np.arange(DAYS, dtype=float)}, index=long),
+        "BBBB.JK": pd.DataFrame({'Close': np.arange(DAYS, dtype=float)}, index=later),
+    }
+    entry, exit_bar = DAYS - 6, DAYS - 3
+
+    def fake_signals(df, model):
+        n = len(df)
+        signals = {name: np.zeros(n) for name in ('score', 'sl', 'sizing_price', 'exit_price')}
+        signals['entry'] = np.zeros(n, dtype=bool)
+        signals['win'] = np.zeros(n, dtype=bool)
+        signals['exit_idx'] = np.full(n, -1)
+        if df.index[0] == long[0]:
+            signals['entry'][entry] = True
+            signals['exit_idx'][entry] = exit_bar
+        return signals
+
+    class Metrics:
+        def span(self, *args):
+            return contextlib.nullcontext()
+
+        def ticker_done(self):
+            pass
+
+    monkeypatch.setattr(portfolio_backtest, "ticker_signals", fake_signals)
+    panel = portfolio_backtest.build_panel(frames, None, Metrics(), days=DAYS)
+
+    assert panel['calendar'][0] == later[0]
+    row = panel['tickers'].index("AAAA.JK")
+    day = panel['calendar'].get_loc(long[entry])
+    assert panel['entry'][row, day]
+    assert panel['calendar'][panel['exit_day'][row, day]] == long[exit_bar]